@@ -1,5 +1,7 @@
 import asyncio
 import itertools
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
 
 from discord.utils import Values, AutocompleteFunc, AutocompleteContext, V
 from rapidfuzz import process
@@ -10,6 +12,35 @@ from datamodels.genshin_user import GenshinUser
 from datamodels.uid_mapping import UidMapping
 
 
+class AutocompleteIndex:
+    """
+    Choices prepared once for matching, so each keystroke only pays for the match itself.
+    Inputs of up to PREFIX_LENGTH characters are answered from a prefix table when possible.
+    """
+
+    PREFIX_LENGTH = 2
+
+    def __init__(self, values: Iterable[str]):
+        # lookup to reverse case-lowering
+        lower_dict = {val.lower(): val for val in values}
+        self.values = list(lower_dict.values())
+        self.choices = list(lower_dict.keys())
+
+        self.prefixes: Dict[str, List[int]] = defaultdict(list)
+        for i, choice in enumerate(self.choices):
+            for length in range(1, min(len(choice), self.PREFIX_LENGTH) + 1):
+                self.prefixes[choice[:length]].append(i)
+
+    def search(self, query: str, threshold: int, limit: int = 25) -> List[str]:
+        query = query.lower()
+
+        if len(query) <= self.PREFIX_LENGTH and query in self.prefixes:
+            return [self.values[i] for i in self.prefixes[query][:limit]]
+
+        matches = process.extract(query, self.choices, limit=limit, score_cutoff=threshold)
+        return [self.values[idx] for val, score, idx in matches]
+
+
 def fuzzy_autocomplete(values: Values, threshold: int = 50) -> AutocompleteFunc:
     """
     Levenshtein matching allowing for small typos.
@@ -17,11 +48,16 @@ def fuzzy_autocomplete(values: Values, threshold: int = 50) -> AutocompleteFunc:
     :param values: Possible values for the option.
         Accepts an iterable of :class:`str`, a callable (sync or async) that takes a single argument of
         :class:`AutocompleteContext`, or a coroutine. Must resolve to an iterable of :class:`str`.
+        The matching index is rebuilt whenever this resolves to a different object,
+        so callables should return the same object until their values change.
     :param threshold: Lowest matching threshold.
     :return: A wrapped callback for the autocomplete.
     """
+    source = None
+    index: Optional[AutocompleteIndex] = None
 
     async def autocomplete_callback(ctx: AutocompleteContext) -> V:
+        nonlocal source, index
         _values = values  # since we reassign later, python considers it local if we don't do this
 
         if callable(_values):
@@ -32,31 +68,57 @@ def fuzzy_autocomplete(values: Values, threshold: int = 50) -> AutocompleteFunc:
         if not ctx.value:
             return iter(itertools.islice(_values, 25))
 
-        # lookup to reverse case-lowering
-        lower_dict = {val.lower(): val for val in _values}
-        matches = process.extract(ctx.value.lower(), list(lower_dict.keys()), limit=25)
-        return (lower_dict[val] for val, score, idx in matches if score >= threshold)
+        if _values is not source or index is None:
+            source = _values
+            index = AutocompleteIndex(_values)
+
+        return index.search(ctx.value, threshold)
 
     return autocomplete_callback
 
 
+# discord_id -> suggestions, loaded on first use and dropped whenever the user's accounts change
+_account_suggestions: Dict[int, List[str]] = {}
+_uid_suggestions: Dict[int, List[str]] = {}
+
+
+def invalidate_suggestions(discord_id: int):
+    """
+    Must be called after the accounts or UIDs of a Discord user change.
+    """
+    _account_suggestions.pop(discord_id, None)
+    _uid_suggestions.pop(discord_id, None)
+
+
 def get_account_suggestions(ctx: AutocompleteContext):
-    ltuid_matches = []
     discord_id = ctx.interaction.user.id
-    for account in session.execute(
-        select(GenshinUser).where(GenshinUser.discord_id == discord_id)
-    ).scalars():
-        if not ctx.value or str(account.mihoyo_id).startswith(str(ctx.value)):
-            ltuid_matches.append(str(account.mihoyo_id))
-    return ltuid_matches
+    if discord_id not in _account_suggestions:
+        _account_suggestions[discord_id] = [
+            str(mihoyo_id)
+            for mihoyo_id in session.execute(
+                select(GenshinUser.mihoyo_id).where(GenshinUser.discord_id == discord_id)
+            ).scalars()
+        ]
+
+    return [
+        ltuid
+        for ltuid in _account_suggestions[discord_id]
+        if not ctx.value or ltuid.startswith(str(ctx.value))
+    ]
 
 
 def get_uid_suggestions(ctx: AutocompleteContext):
-    uid_matches = []
     discord_id = ctx.interaction.user.id
-    for uidmapping in session.execute(
-            select(UidMapping).join(UidMapping.genshin_user).where(GenshinUser.discord_id == discord_id)
-    ).scalars():
-        if not ctx.value or str(uidmapping.uid).startswith(str(ctx.value)):
-            uid_matches.append(str(uidmapping.uid))
-    return uid_matches
+    if discord_id not in _uid_suggestions:
+        _uid_suggestions[discord_id] = [
+            str(uid)
+            for uid in session.execute(
+                select(UidMapping.uid).join(UidMapping.genshin_user).where(GenshinUser.discord_id == discord_id)
+            ).scalars()
+        ]
+
+    return [
+        uid
+        for uid in _uid_suggestions[discord_id]
+        if not ctx.value or uid.startswith(str(ctx.value))
+    ]
@@ -29,3 +29,6 @@ PIXIV_BLOCKED_TAGS = list(
 DAILY_CHECKIN_GAMES = list(
     filter(None, os.getenv("DAILY_CHECKIN_GAMES", "").split(","))
 )
+
+# Reminders sent to the same user within this many seconds are combined into one digest
+NOTIFICATION_DIGEST_SECONDS = int(os.getenv("NOTIFICATION_DIGEST_SECONDS", "300"))
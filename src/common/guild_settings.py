@@ -0,0 +1,64 @@
+"""
+An in-memory copy of the guild settings table. Guild settings should be read and written through this module
+so that lookups don't hit the database and changes take effect immediately.
+"""
+from typing import Dict, Optional
+
+from sqlalchemy import select, delete
+
+from common.db import session
+from datamodels.guild_settings import GuildSettings
+
+_settings: Dict[int, Dict[str, str]] = {}  # guild_id -> key -> value
+_loaded = False
+
+
+def _load():
+    global _loaded
+
+    if not _loaded:
+        for setting in session.execute(select(GuildSettings)).scalars():
+            _settings.setdefault(setting.guild_id, {})[setting.key] = setting.value
+        _loaded = True
+
+
+def get_value(guild_id: int, key: str) -> Optional[str]:
+    _load()
+    return _settings.get(guild_id, {}).get(key)
+
+
+def get_values(key: str) -> Dict[int, str]:
+    """
+    Returns a setting for every guild that has it.
+
+    :param key: A GuildSettingKey.
+    :return: A mapping of guild ids to the setting value.
+    """
+    _load()
+    return {guild_id: values[key] for guild_id, values in _settings.items() if key in values}
+
+
+def set_value(guild_id: int, key: str, value: Optional[str]):
+    """
+    Writes a setting to the database and the cache.
+
+    :param guild_id: Discord guild id.
+    :param key: A GuildSettingKey.
+    :param value: The new value. None removes the setting.
+    """
+    _load()
+
+    if value is not None:
+        session.merge(GuildSettings(guild_id=guild_id, key=key, value=value))
+    else:
+        session.execute(
+            delete(GuildSettings).where(
+                GuildSettings.guild_id == guild_id, GuildSettings.key == key
+            )
+        )
+    session.commit()
+
+    if value is not None:
+        _settings.setdefault(guild_id, {})[key] = value
+    else:
+        _settings.get(guild_id, {}).pop(key, None)
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, String, Boolean
+from sqlalchemy import Column, String, Boolean, Integer, DateTime, ForeignKey
 
 from datamodels import Base
+from datamodels.genshin_user import GenshinUser
 
 
 class RedeemableCode(Base):
@@ -8,3 +9,28 @@ class RedeemableCode(Base):
 
     code = Column(String, primary_key=True)
     working = Column(Boolean, nullable=False, default=True)
+
+
+class RedemptionStatus:
+    PENDING = "pending"
+    REDEEMED = "redeemed"
+    ALREADY_CLAIMED = "claimed"
+    INVALID_CODE = "invalid"
+    FAILED = "failed"
+
+
+class CodeRedemption(Base):
+    """
+    The result of redeeming a code for an account. Pending rows are jobs that have not been processed yet.
+    """
+
+    __tablename__ = "coderedemption"
+
+    mihoyo_id = Column(
+        Integer, ForeignKey(GenshinUser.mihoyo_id, ondelete="CASCADE"), primary_key=True
+    )
+    code = Column(String, primary_key=True)
+    status = Column(String(20), nullable=False, default=RedemptionStatus.PENDING)
+    updated_at = Column(DateTime)  # UTC timezone
+    attempts = Column(Integer, nullable=False, default=0)  # failed attempts that can be retried
+    retry_at = Column(DateTime)  # UTC timezone, when a pending job may be attempted again
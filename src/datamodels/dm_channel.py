@@ -0,0 +1,14 @@
+from sqlalchemy import Integer, Column
+
+from datamodels import Base
+
+
+class DmChannel(Base):
+    """
+    The DM channel of a Discord user, so we don't have to open it again before every message.
+    """
+
+    __tablename__ = "dmchannel"
+
+    discord_id = Column(Integer, primary_key=True)
+    channel_id = Column(Integer, nullable=False)
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, Text
+
+from datamodels import Base
+
+
+class RouteImage(Base):
+    """
+    An image attachment posted in one of the route channels.
+    """
+
+    __tablename__ = "routeimage"
+
+    attachment_id = Column(Integer, primary_key=True)
+    message_id = Column(Integer, nullable=False, index=True)
+    channel_id = Column(Integer, nullable=False)
+    filename = Column(Text, nullable=False)
+    url = Column(Text, nullable=False)
+
+
+class RouteChannel(Base):
+    """
+    How far a route channel has been read, so only newer messages are loaded.
+    """
+
+    __tablename__ = "routechannel"
+
+    channel_id = Column(Integer, primary_key=True)
+    last_message_id = Column(Integer, nullable=False)
@@ -1,22 +1,57 @@
-import asyncio
 import datetime
 import random
 from io import BytesIO
+from typing import Dict, List, Tuple
 
 import aiohttp
 import discord
 import pytz
 from dateutil.relativedelta import relativedelta
 from discord import Option, SlashCommandGroup
-from discord.ext import commands, tasks, pages
-from sqlalchemy import select
+from discord.ext import commands
+from sqlalchemy import select, and_
 
 from common import guild_level, autocomplete
 from common.db import session
-from common.logging import logger
 from datamodels.birthday import Birthday
-from datamodels.guild_settings import GuildSettingKey
-from handlers import guild_manager
+from datamodels.scheduling import ScheduledItem
+from scheduling import birthday as birthday_scheduling
+from scheduling.types import ScheduleType
+
+# guild_id -> (UTC date the list was made, lines sorted by how soon each birthday is)
+_guild_birthdays: Dict[int, Tuple[datetime.date, List[str]]] = {}
+
+
+def get_birthday_lines(guild_id: int) -> List[str]:
+    """
+    Returns the birthdays of a guild formatted for /birthday list, soonest first.
+    The result is cached until the birthdays of the guild change or the day changes.
+    """
+    today = datetime.datetime.utcnow().date()
+    cached = _guild_birthdays.get(guild_id)
+    if cached and cached[0] == today:
+        return cached[1]
+
+    now = datetime.datetime.now(pytz.UTC)
+    bdays = []
+    for bday in session.execute(
+        select(Birthday).where(Birthday.guild_id == guild_id)
+    ).scalars():
+        starts_at = birthday_scheduling.next_birthday_at(
+            bday.month, bday.day, bday.timezone, now
+        )
+        offset = starts_at.astimezone(pytz.timezone(bday.timezone)).strftime("%z")
+        line = f"{bday.month}/{bday.day} <@{bday.discord_id}> `{offset[:3]}:{offset[3:]}`"
+        bdays.append((starts_at, line))
+    bdays.sort()
+
+    lines = [line for _, line in bdays]
+    _guild_birthdays[guild_id] = (today, lines)
+    return lines
+
+
+def invalidate_birthday_lines(guild_id: int):
+    _guild_birthdays.pop(guild_id, None)
 
 
 class BirthdayHandler(commands.Cog):
@@ -26,59 +61,30 @@ class BirthdayHandler(commands.Cog):
 
     def __init__(self, bot: discord.Bot = None):
         self.bot = bot
-        self.guild_manager = guild_manager.GuildSettingManager()
         self.start_up = False
 
     @commands.Cog.listener()
     async def on_ready(self):
         if not self.start_up:
-            await self.birthday_reminder()
-            now = datetime.datetime.now()
-            wait_in_seconds = (
-                (now + relativedelta(hours=1, minute=0, second=0)) - now
-            ).total_seconds()
-            logger.info(
-                f"Birthday reminder task loop is scheduled to start in {wait_in_seconds} seconds"
-            )
-            await asyncio.sleep(wait_in_seconds)
-            self.birthday_reminder_loop.start()
             self.start_up = True
-
-    @tasks.loop(hours=1, reconnect=False)
-    async def birthday_reminder_loop(self):
-        await self.birthday_reminder()
-
-    async def birthday_reminder(self):
-        for bday in session.execute(select(Birthday)).scalars():
-            now = datetime.datetime.now(pytz.timezone(bday.timezone))
-
-            if (
-                bday.reminded_at
-                and (datetime.datetime.utcnow() - bday.reminded_at).days < 180
-            ):
-                continue
-
-            if now.month != bday.month or now.day != bday.day:
-                continue
-
-            logger.info(f"Today is {bday.discord_id}'s birthday!")
-
-            guild = self.bot.get_guild(bday.guild_id)
-            channel_id = self.guild_manager.get_entry(
-                bday.guild_id, GuildSettingKey.BOT_CHANNEL
+            self.schedule_missing_reminders()
+
+    def schedule_missing_reminders(self):
+        """
+        Makes sure every user with a birthday has a reminder in the scheduler.
+        """
+        for discord_id in session.execute(
+            select(Birthday.discord_id.distinct())
+            .outerjoin(
+                ScheduledItem,
+                and_(
+                    ScheduledItem.id == Birthday.discord_id,
+                    ScheduledItem.type == ScheduleType.BIRTHDAY,
+                ),
             )
-
-            if not channel_id:
-                logger.warning(f"Channel ID not set for guild {guild.name}:{guild.id}")
-                continue
-
-            channel = await guild.fetch_channel(channel_id)
-            member = await guild.fetch_member(bday.discord_id)
-
-            await channel.send(f":birthday: Today is {member.mention}'s birthday!")
-
-            bday.reminded_at = datetime.datetime.utcnow()
-            session.commit()
+            .where(ScheduledItem.id.is_(None))
+        ).scalars().all():
+            birthday_scheduling.schedule_reminder(discord_id)
 
     @birthday.command(
         description="Adds your birthday",
@@ -135,6 +141,8 @@ class BirthdayHandler(commands.Cog):
             )
         )
         session.commit()
+        birthday_scheduling.schedule_reminder(member.id)
+        invalidate_birthday_lines(ctx.guild_id)
 
         days_util = (now + relativedelta(month=month, day=day) - now).days
 
@@ -170,6 +178,8 @@ class BirthdayHandler(commands.Cog):
         if record:
             session.delete(record)
             session.commit()
+            birthday_scheduling.schedule_reminder(member.id)
+            invalidate_birthday_lines(ctx.guild_id)
             message = f"Birthday for member {member.mention} has been removed"
         else:
             message = f"Birthday for member {member.mention} was not found"
@@ -181,51 +191,16 @@ class BirthdayHandler(commands.Cog):
         self,
         ctx: discord.ApplicationContext,
     ):
-        await ctx.defer()
-
-        bdays = []
-
-        for bday in session.execute(
-            select(Birthday).where(Birthday.guild_id == ctx.guild_id)
-        ).scalars():
-            now = datetime.datetime.now(pytz.timezone(bday.timezone))
-            date = relativedelta(
-                month=bday.month,
-                day=bday.day,
-                hour=0,
-                minute=0,
-                second=0,
-                microsecond=0,
-            )
-            if now + date < now:
-                date.years = 1
-            delta = now + date - now
-            offset = (now + date).strftime("%z")
-            bdays.append((delta, bday.discord_id, date, offset))
-
-        if not bdays:
-            await ctx.send_followup("No birthday found")
-            return
-
-        bdays.sort()
+        lines = get_birthday_lines(ctx.guild_id)
 
-        lines = []
-        for delta, discord_id, date, offset in bdays:
-            lines.append(
-                f"{date.month}/{date.day} <@{discord_id}> `{offset[:3]}:{offset[3:]}`"
-            )
-
-        embeds = []
-        while lines:
-            embed = discord.Embed(description="\n".join(lines[:10]))
-            lines = lines[10:]
-            embeds.append(embed)
-
-        paginator = pages.Paginator(
-            pages=embeds, show_disabled=True, show_indicator=True, author_check=False
-        )
+        if not lines:
+            await ctx.respond("No birthday found")
+            return
 
-        await paginator.respond(ctx.interaction)
+        view = BirthdayListView(lines)
+        await ctx.respond(embed=view.create_embed(), view=view)
+        # Only set by py-cord once a button is pressed, but the view can time out before that
+        view.message = await ctx.interaction.original_message()
 
     _BIRTHDAY_VOICELINES = {
         "Arataki_Itto": "https://static.wikia.nocookie.net/gensin-impact/images/7/72/VO_Arataki_Itto_Birthday.ogg",
@@ -238,3 +213,40 @@ class BirthdayHandler(commands.Cog):
             async with session.get(url) as response:
                 ogg_file = await response.read()
                 return name, BytesIO(ogg_file)
+
+
+class BirthdayListView(discord.ui.View):
+    PAGE_SIZE = 10
+
+    def __init__(self, lines: List[str]):
+        super().__init__()
+        self.lines = lines
+        self.page = 0
+        self.page_count = (len(lines) - 1) // self.PAGE_SIZE + 1
+        self.update_buttons()
+
+    def create_embed(self) -> discord.Embed:
+        start = self.page * self.PAGE_SIZE
+        embed = discord.Embed(description="\n".join(self.lines[start:start + self.PAGE_SIZE]))
+        embed.set_footer(text=f"Page {self.page + 1}/{self.page_count}")
+        return embed
+
+    def update_buttons(self):
+        self.previous.disabled = self.page == 0
+        self.next.disabled = self.page == self.page_count - 1
+
+    @discord.ui.button(label="<", style=discord.ButtonStyle.gray)
+    async def previous(self, button: discord.ui.Button, interaction: discord.Interaction):
+        self.page -= 1
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.create_embed(), view=self)
+
+    @discord.ui.button(label=">", style=discord.ButtonStyle.gray)
+    async def next(self, button: discord.ui.Button, interaction: discord.Interaction):
+        self.page += 1
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.create_embed(), view=self)
+
+    async def on_timeout(self) -> None:
+        if self.message:
+            await self.message.edit(view=None)
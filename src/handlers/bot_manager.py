@@ -19,13 +19,6 @@ class BotCommandHandler(commands.Cog):
 
     def __init__(self, bot: discord.Bot = None):
         self.bot = bot
-        self.start_up = False
-
-    @commands.Cog.listener()
-    async def on_ready(self):
-        if not self.start_up:
-            await load_images(self.bot)
-            self.start_up = True
 
     @bot.command(
         description="Restarts the bot",
@@ -72,7 +65,7 @@ class BotCommandHandler(commands.Cog):
         guild_ids=guild_level.get_guild_ids(level=5),
     )
     async def reload_routes(self, ctx):
-        count = await load_images(self.bot)
+        count = await load_images(self.bot, full=True)
         await ctx.respond(f"Reloaded {count} images")
 
     @bot.command(
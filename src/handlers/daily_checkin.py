@@ -1,14 +1,16 @@
 import asyncio
 import logging
+import time
+from collections import Counter, defaultdict
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 import discord
 import genshin
 from dateutil.relativedelta import relativedelta
 from discord.ext import tasks, commands
 from genshin import Game
-from sqlalchemy import select
+from sqlalchemy import select, and_, or_
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from common.conf import DAILY_CHECKIN_GAMES
@@ -18,12 +20,27 @@ from common.genshin_server import ServerEnum
 from common.logging import logger
 from datamodels.genshin_user import GenshinUser
 from datamodels.scheduling import ScheduledItem, ItemType
+from utils import notifications
+from utils.rate_limit import RateLimiter
+from utils.worker_pool import run_in_pool
+
+
+class ClaimStatus:
+    CLAIMED = "claimed"
+    ALREADY_CLAIMED = "already-claimed"
+    GEETEST = "geetest"
+    NO_ACCOUNT = "no-account"
+    FAILED = "failed"
 
 
 class HoyolabDailyCheckin(commands.Cog):
     DATABASE_KEY = ItemType.DAILY_CHECKIN
     CHECKIN_TIMEZONE = ServerEnum.ASIA
     TASK_INTERVAL_HOURS = 4
+    WORKERS = 5
+
+    # Shared by all workers to keep the request rate to HoYoLAB in check
+    hoyolab_limiter = RateLimiter(rate=5, per=1)
 
     def __init__(self, bot: discord.Bot = None):
         self.bot = bot
@@ -51,40 +68,75 @@ class HoyolabDailyCheckin(commands.Cog):
     @tasks.loop(hours=4, reconnect=False)
     async def job(self):
         logger.info(f"Daily checkin scan begins")
-        for discord_id in session.execute(
-            select(GenshinUser.discord_id.distinct())
-        ).scalars():
+        start_time = time.monotonic()
+        stats = Counter()
+
+        pending_accounts = self.get_pending_accounts()
+        stats["users"] = len(pending_accounts)
+
+        async def checkin_user(discord_id: int):
             try:
-                discord_user = await self.bot.fetch_user(discord_id)
-                channel = await discord_user.create_dm()
-                await self.checkin(discord_id, channel)
+                await self.checkin(discord_id, pending_accounts[discord_id], stats)
             except Exception:
+                stats["errors"] += 1
                 logging.exception(f"Cannot check in for {discord_id}")
 
-    async def checkin(self, discord_id: int, channel: discord.DMChannel):
-        embeds = []
-        failure_embeds = []
+        await run_in_pool(pending_accounts, checkin_user, self.WORKERS)
+
+        duration = time.monotonic() - start_time
+        logger.info(
+            f"Daily checkin scan finished in {duration:.1f} seconds "
+            f"({stats['users'] / max(duration, 1) * 60:.1f} users/minute): {dict(stats)}"
+        )
+
+    def get_pending_accounts(self) -> Dict[int, List[GenshinUser]]:
+        """
+        Returns the accounts that haven't been checked in today, grouped by Discord user.
+        Accounts that are done, have no token or have opted out are filtered out before any API call.
+        """
+        stmt = (
+            select(GenshinUser)
+            .outerjoin(
+                ScheduledItem,
+                and_(
+                    ScheduledItem.id == GenshinUser.mihoyo_id,
+                    ScheduledItem.type == self.DATABASE_KEY,
+                ),
+            )
+            .where(
+                GenshinUser.hoyolab_token.is_not(None),
+                or_(
+                    ScheduledItem.id.is_(None),
+                    ScheduledItem.done.is_(False),
+                    ScheduledItem.scheduled_at
+                    < self.CHECKIN_TIMEZONE.day_beginning.replace(tzinfo=None),
+                ),
+            )
+        )
 
-        for account in session.execute(
-            select(GenshinUser).where(GenshinUser.discord_id == discord_id)
-        ).scalars():
+        pending_accounts = defaultdict(list)
+        for account in session.execute(stmt).scalars():
             account: GenshinUser
+            if account.settings[Preferences.DAILY_CHECKIN]:
+                pending_accounts[account.discord_id].append(account)
+        return pending_accounts
 
-            if not account.hoyolab_token:
-                continue
+    async def checkin(self, discord_id: int, accounts: List[GenshinUser], stats: Counter):
+        embeds = []
+        failure_embeds = []
 
+        for account in accounts:
             gs = account.client
 
-            if not account.settings[Preferences.DAILY_CHECKIN]:
-                continue
-
             # Validate cookies
             try:
+                await self.hoyolab_limiter.acquire()
                 await gs.get_reward_info()
             except genshin.errors.InvalidCookies:
                 account.hoyolab_token = None
                 session.merge(account)
                 session.commit()
+                stats["expired_accounts"] += 1
                 failure_embeds.append(discord.Embed(
                     title=":warning: Account Access Failure",
                     description=f"Your ltoken has expired for Hoyolab ID {account.mihoyo_id}.\n"
@@ -93,109 +145,143 @@ class HoyolabDailyCheckin(commands.Cog):
                 ))
                 continue
 
-            task: Optional[ScheduledItem] = session.get(
-                ScheduledItem, (account.mihoyo_id, self.DATABASE_KEY)
-            )
+            results = await self.claim_rewards(account)
+            if ClaimStatus.FAILED in results.values():
+                stats["failed_accounts"] += 1
+            else:
+                stats["checked_in_accounts"] += 1
+
+            claimed_games = [
+                game for game, status in results.items() if status == ClaimStatus.CLAIMED
+            ]
+            if claimed_games:
+                embed = discord.Embed()
+                embeds.append(embed)
+                embed.description = (
+                    f"Claimed daily rewards for {len(claimed_games)} game{'s' if len(claimed_games) > 1 else ''} "
+                    f"({', '.join(game.name.lower() for game in claimed_games)}) | Hoyolab ID {account.mihoyo_id}"
+                )
 
-            if (
-                not task
-                or task.scheduled_at
-                < self.CHECKIN_TIMEZONE.day_beginning.replace(tzinfo=None)
-            ):
                 try:
-                    claimed_games = await self.claim_reward(gs)
-                except Exception:
-                    logger.exception("Cannot claim daily rewards")
-                    continue
-                if claimed_games:
-                    embed = discord.Embed()
-                    embeds.append(embed)
-                    embed.description = (
-                        f"Claimed daily rewards for {len(claimed_games)} game{'s' if len(claimed_games) > 1 else ''} "
-                        f"({', '.join(game.name.lower() for game in claimed_games)}) | Hoyolab ID {account.mihoyo_id}"
-                    )
-
-                    try:
-                        for uid in account.genshin_uids:
-                            notes = await gs.get_notes(uid)
-                            resin_capped = notes.current_resin == notes.max_resin
-
-                            embed.add_field(
-                                name=f"{notes.current_resin}/{notes.max_resin} resin",
-                                value=":warning: capped OMG"
-                                if resin_capped
-                                else f"capped <t:{int(notes.resin_recovery_time.timestamp())}:R>",
-                            )
+                    for uid in account.genshin_uids:
+                        await self.hoyolab_limiter.acquire()
+                        notes = await gs.get_notes(uid)
+                        resin_capped = notes.current_resin == notes.max_resin
+
+                        embed.add_field(
+                            name=f"{notes.current_resin}/{notes.max_resin} resin",
+                            value=":warning: capped OMG"
+                            if resin_capped
+                            else f"capped <t:{int(notes.resin_recovery_time.timestamp())}:R>",
+                        )
 
-                            if notes.expeditions:
-                                exp_completed_at = max(exp.completion_time for exp in notes.expeditions)
-                                exp_text = (
-                                    ":warning: all done"
-                                    if exp_completed_at <= datetime.now().astimezone()
-                                    else f"done <t:{int(exp_completed_at.timestamp())}:R>"
-                                )
-                            else:
-                                exp_text = ":warning: No ongoing expeditions"
-
-                            embed.add_field(
-                                name=f"**{len(notes.expeditions)}/{notes.max_expeditions} expeditions dispatched**",
-                                value=exp_text,
+                        if notes.expeditions:
+                            exp_completed_at = max(exp.completion_time for exp in notes.expeditions)
+                            exp_text = (
+                                ":warning: all done"
+                                if exp_completed_at <= datetime.now().astimezone()
+                                else f"done <t:{int(exp_completed_at.timestamp())}:R>"
                             )
-                            
-                            embed.description += f"\nUID-`{uid}`"
-                    except Exception:
-                        logger.exception("Cannot get resin data")
-
-                session.merge(
-                    ScheduledItem(
-                        id=account.mihoyo_id,
-                        type=self.DATABASE_KEY,
-                        scheduled_at=self.CHECKIN_TIMEZONE.day_beginning,
-                        done=True,
-                    )
-                )
-                session.commit()
+                        else:
+                            exp_text = ":warning: No ongoing expeditions"
+
+                        embed.add_field(
+                            name=f"**{len(notes.expeditions)}/{notes.max_expeditions} expeditions dispatched**",
+                            value=exp_text,
+                        )
+                        
+                        embed.description += f"\nUID-`{uid}`"
+                except Exception:
+                    logger.exception("Cannot get resin data")
+
+        if not embeds and not failure_embeds:
+            return
 
         if embeds:
-            await channel.send(
+            await notifications.send_dm(
+                self.bot,
+                discord_id,
                 "I've gone ahead and checked in for you. Have a nice day!",
                 embeds=embeds,
             )
 
         if failure_embeds:
-            await channel.send(
+            await notifications.send_dm(
+                self.bot,
+                discord_id,
                 embeds=failure_embeds,
             )
 
-    @retry(
-        stop=stop_after_attempt(5), wait=wait_exponential(multiplier=2, min=4, max=600)
-    )
-    async def claim_reward(
-        self, client: genshin.Client
-    ) -> List[Game]:
-        checked_in_games = []
+    async def claim_rewards(self, account: GenshinUser) -> Dict[Game, str]:
+        """
+        Claims today's rewards for every configured game concurrently, skipping games that are settled already.
+        Per-game results are kept in the context of the account's schedule entry,
+        which is only marked done once no game is left to retry.
+        """
+        day_beginning = self.CHECKIN_TIMEZONE.day_beginning
+        task: Optional[ScheduledItem] = session.get(
+            ScheduledItem, (account.mihoyo_id, self.DATABASE_KEY)
+        )
+        game_results = {}
+        if (
+            task
+            and task.context
+            and task.scheduled_at >= day_beginning.replace(tzinfo=None)
+        ):
+            game_results = dict(task.context.get("games", {}))
 
-        for game_string in DAILY_CHECKIN_GAMES:
-            game = Game[game_string]
-            try:
-                await client.claim_daily_reward(reward=True, game=game)
-                checked_in_games.append(game)
-            except genshin.errors.DailyGeetestTriggered:
-                logger.info("Skipping geetest")
-                continue
-            except genshin.errors.AlreadyClaimed:
-                logger.info(
-                    f"Daily reward for {game} is already claimed for {client.hoyolab_id}"
-                )
-                continue
-            except genshin.errors.GenshinException as ex:
-                if ex.retcode == -10002:
-                    # No account found
-                    continue
+        games = [
+            Game[game_string]
+            for game_string in DAILY_CHECKIN_GAMES
+            if game_results.get(game_string, ClaimStatus.FAILED) == ClaimStatus.FAILED
+        ]
+        statuses = await asyncio.gather(
+            *(self.claim_game_reward(account.client, game) for game in games),
+            return_exceptions=True,
+        )
 
-                logger.exception(
-                    f"Cannot claim daily rewards for {game} for {client.hoyolab_id}"
+        results = {}
+        for game, status in zip(games, statuses):
+            if isinstance(status, BaseException):
+                logger.error(
+                    f"Cannot claim daily rewards for {game} for {account.mihoyo_id}",
+                    exc_info=status,
                 )
-                raise
+                status = ClaimStatus.FAILED
+            results[game] = status
+            game_results[game.name] = status
+
+        session.merge(
+            ScheduledItem(
+                id=account.mihoyo_id,
+                type=self.DATABASE_KEY,
+                scheduled_at=day_beginning,
+                done=ClaimStatus.FAILED not in game_results.values(),
+                context={"games": game_results},
+            )
+        )
+        session.commit()
 
-        return checked_in_games
+        return results
+
+    @retry(
+        stop=stop_after_attempt(5), wait=wait_exponential(multiplier=2, min=4, max=60)
+    )
+    async def claim_game_reward(self, client: genshin.Client, game: Game) -> str:
+        try:
+            await self.hoyolab_limiter.acquire()
+            await client.claim_daily_reward(reward=True, game=game)
+            return ClaimStatus.CLAIMED
+        except genshin.errors.DailyGeetestTriggered:
+            logger.info("Skipping geetest")
+            return ClaimStatus.GEETEST
+        except genshin.errors.AlreadyClaimed:
+            logger.info(
+                f"Daily reward for {game} is already claimed for {client.hoyolab_id}"
+            )
+            return ClaimStatus.ALREADY_CLAIMED
+        except genshin.errors.GenshinException as ex:
+            if ex.retcode == -10002:
+                # No account found
+                return ClaimStatus.NO_ACCOUNT
+            raise
@@ -2,14 +2,47 @@ import discord
 from discord import Option
 from discord.ext import commands, pages
 
-from common import guild_level, autocomplete
-from interfaces.route_loader import get_route_options, get_route_images
+from common import guild_level, autocomplete, conf
+from common.logging import logger
+from interfaces import route_loader
+from interfaces.route_loader import get_route_options, get_fresh_route_images
 
 
 class FarmRouteHandler(commands.Cog):
     def __init__(self, bot: discord.Bot = None):
         self.bot = bot
         self.start_up = False
+        # Set once the messages posted while offline have been read
+        self.caught_up = False
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if not self.start_up:
+            self.start_up = True
+
+            # Serve what we already know right away, then catch up on messages posted while offline
+            count = route_loader.load_cached_images()
+            logger.info(f"Loaded {count} cached route images")
+            count = await route_loader.load_images(self.bot)
+            logger.info(f"Loaded {count} route images")
+            self.caught_up = True
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if message.channel.id not in conf.ROUTE_CHANNEL_IDS:
+            return
+
+        # Moving the watermark while catching up would skip messages the startup read hasn't reached yet
+        if route_loader.add_message(message, move_watermark=self.caught_up):
+            route_loader.load_cached_images()
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if payload.channel_id not in conf.ROUTE_CHANNEL_IDS:
+            return
+
+        if route_loader.remove_message(payload.message_id):
+            route_loader.load_cached_images()
 
     @commands.slash_command(
         description="Finds a farming route for a resource",
@@ -32,12 +65,13 @@ class FarmRouteHandler(commands.Cog):
     ):
         await ctx.defer(ephemeral=not public)
 
-        if not get_route_images(resource):
+        image_urls = await get_fresh_route_images(self.bot, resource)
+        if not image_urls:
             await ctx.send_followup("No routes found")
             return
 
         embeds = []
-        for image_url in get_route_images(resource):
+        for image_url in image_urls:
             embed = discord.Embed(description=resource.capitalize())
             embed.set_image(url=image_url)
             embeds.append(embed)
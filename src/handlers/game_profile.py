@@ -1,5 +1,9 @@
 import asyncio
+import hashlib
 import io
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
 
 import discord
 from discord import Option
@@ -9,10 +13,82 @@ from enkacard import encbanner
 from enkacard.encbanner import Akasha
 from enkacard.src.generator import teample_two
 from enkanetwork import EnkaNetworkAPI, EnkaNetworkResponse
+from enkanetwork.model.character import CharacterInfo
 
 from common.autocomplete import get_uid_suggestions
 from handlers import base_handler
 
+MAX_CACHED_CARDS = 100
+
+# A single client, since creating one resets the library's own cache
+_enka_client: Optional[EnkaNetworkAPI] = None
+# uid -> (monotonic time the response expires, response)
+_profiles: Dict[int, Tuple[float, EnkaNetworkResponse]] = {}
+# (uid, character id, build hash) -> rendered card, least recently used first
+_cards: "OrderedDict[Tuple[int, int, str], dict]" = OrderedDict()
+
+
+async def fetch_profile(uid: int) -> EnkaNetworkResponse:
+    """
+    Fetches a profile from Enka, reusing the previous response until the ttl given by Enka runs out.
+    """
+    global _enka_client
+
+    now = time.monotonic()
+    cached = _profiles.get(uid)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    if not _enka_client:
+        _enka_client = EnkaNetworkAPI()
+    data = await _enka_client.fetch_user(uid)
+
+    for expired_uid in [key for key, (expires_at, _) in _profiles.items() if expires_at <= now]:
+        del _profiles[expired_uid]
+    _profiles[uid] = (now + data.ttl, data)
+
+    return data
+
+
+def build_hash(character: CharacterInfo) -> str:
+    """
+    Identifies everything shown on a character card, so a card is only rendered again when the build changes.
+    """
+    build = (
+        character.level,
+        character.ascension,
+        character.constellations_unlocked,
+        character.friendship_level,
+        [(skill.id, skill.level) for skill in character.skills],
+        [
+            (
+                equipment.id,
+                equipment.level,
+                equipment.refinement,
+                [
+                    (stat.prop_id, stat.value)
+                    for stat in [equipment.detail.mainstats, *equipment.detail.substats]
+                    if stat
+                ],
+            )
+            for equipment in character.equipments
+        ],
+    )
+    return hashlib.sha256(repr(build).encode()).hexdigest()
+
+
+def get_cached_card(uid: int, character: CharacterInfo) -> Optional[dict]:
+    key = (uid, character.id, build_hash(character))
+    if key in _cards:
+        _cards.move_to_end(key)
+        return _cards[key]
+
+
+def cache_card(uid: int, character: CharacterInfo, card: dict):
+    _cards[(uid, character.id, build_hash(character))] = card
+    while len(_cards) > MAX_CACHED_CARDS:
+        _cards.popitem(last=False)
+
 
 class GameCharacterDropdown(Select):
     def __init__(self, enkanetwork_resp: EnkaNetworkResponse, akasha_ranking: bool):
@@ -30,7 +106,15 @@ class GameCharacterDropdown(Select):
         super().__init__(placeholder='Choose a character to create card...', min_values=1, max_values=1, options=options)
 
         self.tasks = {}
-        asyncio.create_task(self.load_card_images(akasha_ranking))
+        for character in enkanetwork_resp.characters:
+            card = get_cached_card(enkanetwork_resp.uid, character)
+            if card:
+                self.cards[character.id] = card
+                self.tasks[character.id] = asyncio.get_running_loop().create_future()
+                self.tasks[character.id].set_result(None)
+
+        if len(self.cards) < len(enkanetwork_resp.characters):
+            asyncio.create_task(self.load_card_images(akasha_ranking))
 
     async def load_card_images(self, akasha_ranking: bool):
         async def create_art(cards_dict, key, art, setting, template):
@@ -39,6 +123,7 @@ class GameCharacterDropdown(Select):
                 encard.enc.player.nickname, setting).start(False)
             if akasha_ranking:
                 cards_dict[key.id] = await Akasha(encard.uid).start(cards_dict[key.id], template)
+            cache_card(self.enkanetwork_resp.uid, key, cards_dict[key.id])
 
         async with encbanner.ENC(uid=self.enkanetwork_resp.uid) as encard:
             template = 2
@@ -57,6 +142,9 @@ class GameCharacterDropdown(Select):
                     if not str(key.id) in encard.character_id:
                         continue
 
+                if key.id in self.cards:
+                    continue
+
                 if key.id in generator:
                     if not generator.get(key.id, None) is None:
                         gen_tools.append(generator.get(key.id))
@@ -149,8 +237,7 @@ class GameProfileHandler(base_handler.BaseHandler):
             await ctx.respond("Please provide a UID")
             return
 
-        client = EnkaNetworkAPI()
-        data = await client.fetch_user(int(uid))
+        data = await fetch_profile(int(uid))
 
         intro_embed = await self.create_intro_embed(data)
         embeds = [intro_embed]
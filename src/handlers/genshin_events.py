@@ -1,21 +1,66 @@
+import asyncio
 import re
+from collections import OrderedDict
+from typing import Optional
 
 import aiohttp
 import discord
 import pytz
 from discord.ext import commands
-from sqlalchemy import select
+from yarl import URL
 
 from common import conf
 from common.db import session
+from common.logging import logger
 from datamodels import genshin_events
-from datamodels.guild_settings import GuildSettings, GuildSettingKey
+from datamodels.guild_settings import GuildSettingKey
+from utils.announcements import announce, get_channel
+
+RESOLVE_TIMEOUT = aiohttp.ClientTimeout(total=10)
+MAX_CONCURRENT_RESOLVES = 8
+MAX_RESOLVED_URLS = 1000
+
+# url -> where it ends up, least recently used first
+_resolved_urls: "OrderedDict[str, URL]" = OrderedDict()
+_resolve_semaphore = asyncio.Semaphore(MAX_CONCURRENT_RESOLVES)
+
+
+async def resolve_url(httpsession: aiohttp.ClientSession, url: str) -> Optional[URL]:
+    """
+    Follows redirects to find where a url ends up, without downloading the page.
+    """
+    if url in _resolved_urls:
+        _resolved_urls.move_to_end(url)
+        return _resolved_urls[url]
+
+    try:
+        async with _resolve_semaphore:
+            async with httpsession.head(
+                url, allow_redirects=True, timeout=RESOLVE_TIMEOUT
+            ) as response:
+                if response.status == 405:
+                    # Some servers don't allow HEAD. The body is never read so it's cheap anyway.
+                    async with httpsession.get(url, timeout=RESOLVE_TIMEOUT) as get_response:
+                        response = get_response
+                resolved_url = response.url
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        logger.warning(f"Cannot resolve {url}")
+        return None
+
+    _resolved_urls[url] = resolved_url
+    while len(_resolved_urls) > MAX_RESOLVED_URLS:
+        _resolved_urls.popitem(last=False)
+    return resolved_url
 
 
 class GenshinEventScanner(commands.Cog):
+    DEBOUNCE_SECONDS = 10  # news usually comes in bursts, so wait for the burst to finish
+
     def __init__(self, bot: discord.Bot):
         self.bot = bot
         self.start_up = False
+        self.lock = asyncio.Lock()
+        self.pending: Optional[asyncio.Task] = None
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -25,23 +70,35 @@ class GenshinEventScanner(commands.Cog):
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
-        if message.channel.id in conf.NEWS_CHANNEL_IDS:
+        if message.channel.id in conf.NEWS_CHANNEL_IDS and not self.pending:
+            self.pending = asyncio.create_task(self.process_message_later())
+
+    async def process_message_later(self):
+        await asyncio.sleep(self.DEBOUNCE_SECONDS)
+        # Messages arriving from now on need another run
+        self.pending = None
+        try:
             await self.process_message()
+        except Exception:
+            logger.exception("Cannot process news messages")
 
     async def process_message(self):
-        async with aiohttp.ClientSession() as httpsession:
+        async with self.lock, aiohttp.ClientSession() as httpsession:
             for news_channel_id in conf.NEWS_CHANNEL_IDS:
                 source = session.get(genshin_events.EventSource, (news_channel_id,))
-                channel = await self.bot.fetch_channel(news_channel_id)
-                events = []
+                channel = await get_channel(self.bot, news_channel_id)
                 latest = None
+                candidates = []
 
-                async for message in channel.history(limit=100):
-                    if source and message.created_at <= source.read_until.replace(
-                        tzinfo=pytz.UTC
-                    ):
-                        break
-                    if not latest:
+                if source:
+                    history = channel.history(
+                        limit=100, after=source.read_until.replace(tzinfo=pytz.UTC)
+                    )
+                else:
+                    history = channel.history(limit=100)
+
+                async for message in history:
+                    if not latest or message.created_at > latest:
                         latest = message.created_at
                     for embed in message.embeds:
                         if not embed.description:
@@ -49,42 +106,39 @@ class GenshinEventScanner(commands.Cog):
                         for url in re.findall(
                             r"https://[A-z0-9./?#]+", embed.description
                         ):
-                            async with httpsession.get(url) as response:
-                                if (
-                                    response.url.host == "webstatic-sea.hoyoverse.com"
-                                    and response.url.path.startswith("/ys/event/")
-                                ):
-                                    events.append(
-                                        genshin_events.GenshinEvent(
-                                            id=response.url.path,
-                                            type="web",
-                                            description=embed.description,
-                                            url=url,
-                                            start_time=message.created_at,
-                                        )
-                                    )
+                            candidates.append((message, embed, url))
+
+                resolved_urls = await asyncio.gather(
+                    *(resolve_url(httpsession, url) for _, _, url in candidates)
+                )
+
+                events = []
+                for (message, embed, url), resolved_url in zip(candidates, resolved_urls):
+                    if (
+                        resolved_url
+                        and resolved_url.host == "webstatic-sea.hoyoverse.com"
+                        and resolved_url.path.startswith("/ys/event/")
+                    ):
+                        events.append(
+                            genshin_events.GenshinEvent(
+                                id=resolved_url.path,
+                                type="web",
+                                description=embed.description,
+                                url=url,
+                                start_time=message.created_at,
+                            )
+                        )
 
                 for event in events:
                     existing = session.get(genshin_events.GenshinEvent, (event.id,))
                     if not existing:
                         session.add(event)
-                        for event_channel in session.execute(
-                            select(GuildSettings).where(
-                                GuildSettings.key == GuildSettingKey.EVENT_CHANNEL
-                            )
-                        ).scalars():
-                            embed = discord.Embed(description=event.description)
-                            channel = await self.bot.fetch_channel(event_channel.value)
-                            event_role = session.get(
-                                GuildSettings,
-                                (event_channel.guild_id, GuildSettingKey.EVENT_ROLE),
-                            )
-                            await channel.send(
-                                content=f"\n<@&{event_role.value}>"
-                                if event_role
-                                else None,
-                                embed=embed,
-                            )
+                        await announce(
+                            self.bot,
+                            GuildSettingKey.EVENT_CHANNEL,
+                            GuildSettingKey.EVENT_ROLE,
+                            discord.Embed(description=event.description),
+                        )
                         session.commit()
 
                 if latest:
@@ -2,11 +2,9 @@ import discord
 from discord import SlashCommandGroup, Option
 from discord.ext import commands
 from discord.ext.commands import has_permissions
-from sqlalchemy import delete
 
-from common import guild_level, autocomplete
-from common.db import session
-from datamodels.guild_settings import GuildSettings, ALL_KEYS
+from common import guild_level, autocomplete, guild_settings
+from datamodels.guild_settings import ALL_KEYS
 
 setting_autocomplete = autocomplete.fuzzy_autocomplete(list(ALL_KEYS.values()))
 
@@ -21,8 +19,7 @@ class GuildSettingManager(commands.Cog):
         self.bot = bot
 
     def get_entry(self, guild_id: int, key: str):
-        row = session.get(GuildSettings, (guild_id, key))
-        return row.value if row else None
+        return guild_settings.get_value(guild_id, key)
 
     @guild.command(description="Sets guild config [admin-only]")
     @has_permissions(administrator=True)
@@ -36,15 +33,6 @@ class GuildSettingManager(commands.Cog):
             await ctx.respond("Not a valid key", ephemeral=True)
             return
 
-        if value is not None:
-            session.merge(GuildSettings(guild_id=ctx.guild_id, key=key, value=value))
-        else:
-            session.execute(
-                delete(GuildSettings).where(
-                    GuildSettings.guild_id == ctx.guild_id, GuildSettings.key == key
-                )
-            )
-
-        session.commit()
+        guild_settings.set_value(ctx.guild_id, key, value)
 
         await ctx.respond("Value set successfully", ephemeral=True)
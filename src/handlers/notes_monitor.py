@@ -13,6 +13,7 @@ from common.db import session
 from common.logging import logger
 from datamodels.genshin_user import GenshinUser
 from datamodels.scheduling import ScheduledItem, ItemType
+from utils import notifications
 from utils.game_notes import get_notes
 
 
@@ -95,9 +96,9 @@ class BaseMonitor:
 
     async def send_dm(self, account: GenshinUser, uid: int):
         logger.info(f"Sending DM to {account.discord_id}")
-        discord_user = await self.bot.fetch_user(account.discord_id)
-        channel = await discord_user.create_dm()
-        await channel.send(embed=await self.create_notification_embed(uid))
+        await notifications.send_reminder(
+            self.bot, account.discord_id, await self.create_notification_embed(uid)
+        )
 
 
 class ResinMonitor(BaseMonitor):
@@ -1,5 +1,6 @@
 import asyncio
-from typing import List
+from collections import Counter
+from typing import List, Dict, Set
 
 import discord
 import genshin.errors
@@ -11,13 +12,26 @@ from common import guild_level
 from common.constants import Emoji
 from common.db import session
 from common.logging import logger
+from datamodels.code_redemption import RedemptionStatus
 from datamodels.genshin_user import GenshinUser
 from datamodels.uid_mapping import UidMapping
+from interfaces.code_redeemer import (
+    CodeRedeemer,
+    RETRYABLE_ERRORS,
+    get_redeemed_accounts,
+    record_redemption,
+)
+from utils import notifications
+from utils.worker_pool import run_in_pool
 
 
 class RedeemCodes(commands.Cog):
+    WORKERS = 5
+    PROGRESS_INTERVAL = 2  # seconds between progress updates
+
     def __init__(self, bot: discord.Bot = None):
         self.bot = bot
+        self.redeemer = CodeRedeemer()
 
     @commands.slash_command(
         description="Redeems Genshin codes",
@@ -60,70 +74,145 @@ class RedeemCodes(commands.Cog):
                 .all()
             )
 
-        genshin_codes = set(codes.split(","))
+        genshin_codes = list(dict.fromkeys(code.strip().upper() for code in codes.split(",")))
 
         if len(genshin_codes) > 5:
             await ctx.respond(f"Too many codes")
             return
 
         await ctx.defer()
-        embeds = []
 
-        for code in genshin_codes:
-            code = code.strip().upper()
-            embed = discord.Embed(
-                description=f"{Emoji.LOADING} Redeeming code {code}... "
-            )
-            embeds.append(embed)
+        # The ledger only tracks redemptions for the main UID of each account
+        redeemed_accounts = {
+            code: set() if target_uid else get_redeemed_accounts(code)
+            for code in genshin_codes
+        }
+        results = {code: Counter() for code in genshin_codes}
+        invalid_codes = set()
+
+        async def redeem_account(account: GenshinUser):
+            counted_codes = set()
+            try:
+                await self.redeem_for_account(
+                    account,
+                    genshin_codes,
+                    target_uid,
+                    redeemed_accounts,
+                    invalid_codes,
+                    results,
+                    counted_codes,
+                )
+            except Exception:
+                logger.exception(f"Cannot redeem codes for {account.mihoyo_id}")
+                for code in genshin_codes:
+                    if code not in counted_codes:
+                        results[code][RedemptionStatus.FAILED] += 1
+
+        async def report_progress():
+            while True:
+                try:
+                    await ctx.edit(embeds=self.create_embeds(results, len(accounts), done=False))
+                except discord.HTTPException as ex:
+                    logger.warning("Cannot update code redemption progress", exc_info=True)
+                    # The interaction token has expired, so no later edit can succeed either
+                    if ex.status in (401, 404):
+                        return
+                await asyncio.sleep(self.PROGRESS_INTERVAL)
+
+        reporter = asyncio.create_task(report_progress())
+        try:
+            await run_in_pool(accounts, redeem_account, self.WORKERS)
+        finally:
+            reporter.cancel()
+
+        embeds = self.create_embeds(results, len(accounts), done=True)
+        try:
             await ctx.edit(embeds=embeds)
-            already_claimed = 0
-            redeemed = 0
+        except discord.HTTPException:
+            # Interaction tokens expire after 15 minutes, which a large batch can outlast
+            logger.warning("Cannot edit the code redemption response", exc_info=True)
+            await ctx.channel.send(embeds=embeds)
+
+    async def redeem_for_account(
+        self,
+        account: GenshinUser,
+        codes: List[str],
+        target_uid: int,
+        redeemed_accounts: Dict[str, Set[int]],
+        invalid_codes: Set[str],
+        results: Dict[str, Counter],
+        counted_codes: Set[str],
+    ):
+        """
+        Redeems the codes for one account. Every code that gets a result is added to counted_codes.
+        """
+        gs = account.client
+        redeemed_before = False
+
+        def count(code: str, status: str):
+            results[code][status] += 1
+            counted_codes.add(code)
+
+        for i, code in enumerate(codes):
+            if code in invalid_codes:
+                count(code, RedemptionStatus.INVALID_CODE)
+                continue
+
+            if account.mihoyo_id in redeemed_accounts[code]:
+                count(code, RedemptionStatus.ALREADY_CLAIMED)
+                continue
+
+            if redeemed_before:
+                await asyncio.sleep(CodeRedeemer.ACCOUNT_COOLDOWN)
 
             try:
-                for i, account in enumerate(accounts):
-                    embed.description = (
-                        f"{Emoji.LOADING} Redeeming code {code}... {i}/{len(accounts)}"
+                status = await self.redeemer.redeem(gs, code, uid=target_uid)
+                redeemed_before = True
+            except genshin.errors.InvalidCookies:
+                account.mihoyo_token = None
+                session.merge(account)
+                session.commit()
+                for remaining_code in codes[i:]:
+                    count(remaining_code, RedemptionStatus.FAILED)
+                await notifications.send_dm(
+                    self.bot,
+                    account.discord_id,
+                    embed=discord.Embed(
+                        title=":warning: Account Access Failure",
+                        description=f"Your cookie_token has expired for Hoyolab ID {account.mihoyo_id}.\n"
+                                    f"This may be because you have changed your password recently.\n"
+                                    f"Please register again if you want to continue using the bot."
                     )
-                    await ctx.edit(embeds=embeds)
-                    gs = account.client
-
-                    try:
-                        if target_uid:
-                            await gs.redeem_code(code, uid=target_uid)
-                        else:
-                            await gs.redeem_code(code)
-                        redeemed += 1
-                    except genshin.errors.InvalidCookies:
-                        account.mihoyo_token = None
-                        session.merge(account)
-                        session.commit()
-                        user = await self.bot.fetch_user(account.discord_id)
-                        dm_channel = await self.bot.create_dm(user)
-                        await dm_channel.send(
-                            embed=discord.Embed(
-                                title=":warning: Account Access Failure",
-                                description=f"Your cookie_token has expired for Hoyolab ID {account.mihoyo_id}.\n"
-                                            f"This may be because you have changed your password recently.\n"
-                                            f"Please register again if you want to continue using the bot."
-                            )
-                        )
-                    except genshin.errors.GenshinException as e:
-                        if e.retcode == -2017:
-                            already_claimed += 1
-                        else:
-                            raise e
-
-                embed.description = f"Redeemed code {code} for {redeemed} accounts."
-                if already_claimed:
-                    embed.description += (
-                        f"\n{already_claimed} accounts already claimed this code."
+                )
+                return
+            except RETRYABLE_ERRORS:
+                logger.warning(f"Cannot redeem code {code} for {account.mihoyo_id}", exc_info=True)
+                status = RedemptionStatus.FAILED
+
+            if status == RedemptionStatus.INVALID_CODE:
+                invalid_codes.add(code)
+            elif not target_uid and status != RedemptionStatus.FAILED:
+                record_redemption(account.mihoyo_id, code, status)
+
+            count(code, status)
+
+    def create_embeds(self, results: Dict[str, Counter], total: int, done: bool) -> List[discord.Embed]:
+        embeds = []
+
+        for code, counter in results.items():
+            if not done:
+                description = f"{Emoji.LOADING} Redeeming code {code}... {sum(counter.values())}/{total}"
+            elif counter[RedemptionStatus.INVALID_CODE]:
+                description = f"Code {code} is invalid. wdf"
+            else:
+                description = f"Redeemed code {code} for {counter[RedemptionStatus.REDEEMED]} accounts."
+                if counter[RedemptionStatus.ALREADY_CLAIMED]:
+                    description += (
+                        f"\n{counter[RedemptionStatus.ALREADY_CLAIMED]} accounts already claimed this code."
                     )
-            except genshin.errors.GenshinException as e:
-                if e.retcode == -2003:
-                    embed.description = f"Code {code} is invalid. wdf"
-                else:
-                    logger.exception("Code can't be claimed")
-                    raise e
+                if counter[RedemptionStatus.FAILED]:
+                    description += f"\n{counter[RedemptionStatus.FAILED]} accounts failed to redeem this code."
 
-            await ctx.edit(embeds=embeds)
-            await asyncio.sleep(3)
+            embeds.append(discord.Embed(description=description))
+
+        return embeds
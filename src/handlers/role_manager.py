@@ -5,10 +5,9 @@ from typing import List
 import discord
 from discord.ext import commands
 
-from common import guild_level
-from common.db import session
+from common import guild_level, guild_settings
 from common.logging import logger
-from datamodels.guild_settings import GuildSettings, GuildSettingKey
+from datamodels.guild_settings import GuildSettingKey
 
 
 class Dropdown(discord.ui.Select):
@@ -69,16 +68,14 @@ class RoleManager(commands.Cog):
     async def roles(self, ctx: discord.ApplicationContext):
         await ctx.defer(ephemeral=True)
         options = []
-        roles = session.get(
-            GuildSettings, (ctx.guild_id, GuildSettingKey.SELF_ASSIGNABLE_ROLES)
-        )
+        roles = guild_settings.get_value(ctx.guild_id, GuildSettingKey.SELF_ASSIGNABLE_ROLES)
 
         if not roles:
             await ctx.respond("This server does not have any self-assignable roles")
             return
 
         try:
-            roles = json.loads(roles.value)
+            roles = json.loads(roles)
         except JSONDecodeError:
             logger.exception("Can't decode json")
             await ctx.respond("Mis-configured roles. Talk to your server owner")
@@ -1,17 +1,21 @@
+import asyncio
 import dataclasses
-import io
+from datetime import datetime, timedelta
+from typing import Optional
 
 import aiohttp
 import discord
 from dateutil.parser import parse
-from discord.ext import commands
+from discord.ext import commands, tasks
 from sqlalchemy import select
 
-from common import guild_level, conf
+from common import guild_level
 from common.db import session
-from common.genshin_server import ServerEnum
+from common.genshin_server import ServerEnum, SERVER_RESET_TIME
+from common.logging import logger
 from datamodels.spiral_abyss import SpiralAbyssRotation
 from utils.html_parser import HtmlParser
+from utils.image_hosting import upload_images
 from utils.images import create_image_with_label, create_collage, create_label
 
 
@@ -39,11 +43,61 @@ class AbyssFloor:
     chambers: list[AbyssChamber] = dataclasses.field(default_factory=list)
 
 
+def _after_reset(**kwargs):
+    reset_time = datetime.combine(datetime.today(), SERVER_RESET_TIME) + timedelta(**kwargs)
+    return reset_time.time().replace(tzinfo=ServerEnum.NORTH_AMERICA.tzoffset)
+
+
+# Abyss rotates at a daily reset, but the wiki may take a while to be updated, so we check a few times.
+PREBUILD_TIMES = [_after_reset(minutes=5), _after_reset(hours=1), _after_reset(hours=6)]
+
+
+def _next_prebuild_time(now: datetime) -> datetime:
+    candidates = [
+        datetime.combine(now.date() + timedelta(days=days), prebuild_time)
+        for days in (0, 1)
+        for prebuild_time in PREBUILD_TIMES
+    ]
+    return min(candidate for candidate in candidates if candidate > now)
+
+
+# The wiki gives the last day of a rotation, which parses as its midnight
+ROTATION_LAST_DAY = timedelta(days=1)
+
+
+class LineupNotUpdatedError(Exception):
+    pass
+
+
 class SpiralAbyssHandler(commands.Cog):
     ABYSS_URL = "https://genshin-impact.fandom.com/wiki/Spiral_Abyss/Floors"
 
     def __init__(self, bot: discord.Bot = None):
         self.bot = bot
+        self.start_up = False
+        self.build_lock = asyncio.Lock()
+        # Set when the wiki still shows the previous rotation, so it isn't fetched again before the next prebuild
+        self.next_build_attempt: Optional[datetime] = None
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if not self.start_up:
+            self.start_up = True
+            await self.prebuild_lineup()
+            self.prebuild.start()
+
+    @tasks.loop(time=PREBUILD_TIMES, reconnect=False)
+    async def prebuild(self):
+        self.next_build_attempt = None
+        await self.prebuild_lineup()
+
+    async def prebuild_lineup(self):
+        try:
+            await self.get_abyss_lineup()
+        except LineupNotUpdatedError:
+            logger.info("Abyss lineup is not updated on the wiki yet")
+        except Exception:
+            logger.exception("Cannot prebuild abyss lineup")
 
     async def _create_chamber_image(self, chamber: AbyssChamber) -> bytes:
         async with aiohttp.ClientSession() as session:
@@ -64,23 +118,43 @@ class SpiralAbyssHandler(commands.Cog):
 
             return create_collage(1, half_images, padding=4)
 
-    async def get_abyss_lineup(self) -> list[dict]:
+    def get_current_rotation(self) -> Optional[SpiralAbyssRotation]:
         current_time = ServerEnum.NORTH_AMERICA.current_time.replace(tzinfo=None)
-        rotations = (
+        return (
             session.execute(
-                select(SpiralAbyssRotation).where(
+                select(SpiralAbyssRotation)
+                .where(
                     SpiralAbyssRotation.start <= current_time,
-                    SpiralAbyssRotation.end >= current_time,
+                    SpiralAbyssRotation.end > current_time - ROTATION_LAST_DAY,
                 )
+                .order_by(SpiralAbyssRotation.id.desc())
             )
             .scalars()
-            .all()
+            .first()
         )
 
-        if rotations:
-            return rotations[0].data
+    async def get_abyss_lineup(self) -> list[dict]:
+        rotation = self.get_current_rotation()
+
+        if not rotation:
+            # Only one caller builds the lineup. Everyone else waits and reads the result from the database.
+            async with self.build_lock:
+                rotation = self.get_current_rotation()
+                if not rotation:
+                    now = ServerEnum.NORTH_AMERICA.current_time
+                    if self.next_build_attempt and now < self.next_build_attempt:
+                        raise LineupNotUpdatedError()
+                    try:
+                        rotation = await self.build_rotation()
+                    except LineupNotUpdatedError:
+                        self.next_build_attempt = _next_prebuild_time(now)
+                        raise
 
-        html = HtmlParser(self.ABYSS_URL)
+        return rotation.data
+
+    async def build_rotation(self) -> SpiralAbyssRotation:
+        logger.info("Building abyss lineup")
+        html = await HtmlParser.fetch(self.ABYSS_URL)
         node = html.xpath('//*[@id="Abyssal_Moon_Spire"]')[0].getparent()
         period = (
             html.xpath("//*[contains(text(),'(Present)')]")[0]
@@ -88,7 +162,14 @@ class SpiralAbyssHandler(commands.Cog):
             .strip()
         )
 
+        # Right after a reset the wiki may still show the previous rotation, which isn't worth rendering
+        dates = list(map(parse, period.split("-")))
+        current_time = ServerEnum.NORTH_AMERICA.current_time.replace(tzinfo=None)
+        if not dates[0] <= current_time < dates[1] + ROTATION_LAST_DAY:
+            raise LineupNotUpdatedError()
+
         floors = []
+        chamber_files = []
 
         while node is not None:
             if node.tag == "h4" and "Floor " in node.text_content():
@@ -137,30 +218,42 @@ class SpiralAbyssHandler(commands.Cog):
                                             enemy_list.append(enemy)
                                     chamber.halves.append(enemy_list)
 
-                            image = await self._create_chamber_image(chamber)
-                            channel = await self.bot.fetch_channel(
-                                conf.IMAGE_HOSTING_CHANNEL_ID
+                            chamber_files.append(
+                                (chamber, f"{abyss_floor.name}-{chamber.name}.png")
                             )
-                            message = await channel.send(
-                                file=discord.File(
-                                    io.BytesIO(image),
-                                    filename=f"{abyss_floor.name}-{chamber.name}.png",
-                                )
-                            )
-                            chamber.image_url = message.attachments[0].url
-
                             abyss_floor.chambers.append(chamber)
 
                 floors.append(abyss_floor)
             else:
                 node = node.getnext()
 
-        dates = list(map(parse, period.split("-")))
-        rotation = SpiralAbyssRotation(start=dates[0], end=dates[1], data=floors)
-        session.add(rotation)
+        images = await asyncio.gather(
+            *(self._create_chamber_image(chamber) for chamber, _ in chamber_files)
+        )
+        urls = await upload_images(
+            self.bot,
+            {filename: image for (_, filename), image in zip(chamber_files, images)},
+        )
+        for chamber, filename in chamber_files:
+            chamber.image_url = urls[filename]
+
+        rotation = (
+            session.execute(
+                select(SpiralAbyssRotation).where(SpiralAbyssRotation.start == dates[0])
+            )
+            .scalars()
+            .first()
+        )
+
+        if rotation:
+            rotation.end = dates[1]
+            rotation.data = floors
+        else:
+            rotation = SpiralAbyssRotation(start=dates[0], end=dates[1], data=floors)
+            session.add(rotation)
         session.commit()
 
-        return rotation.data
+        return rotation
 
     @commands.slash_command(
         description="Shows abyss lineup",
@@ -168,7 +261,11 @@ class SpiralAbyssHandler(commands.Cog):
     )
     async def abyss(self, ctx):
         await ctx.defer()
-        floors = await self.get_abyss_lineup()
+        try:
+            floors = await self.get_abyss_lineup()
+        except LineupNotUpdatedError:
+            await ctx.send_followup("The lineup of the new rotation is not available yet. Please try again later.")
+            return
         view = AbyssLineupView(ctx=ctx, floor_data=floors)
         await ctx.send_followup(embeds=view.embeds, view=view)
 
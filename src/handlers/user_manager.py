@@ -17,11 +17,12 @@ from sqlalchemy import select, delete, func
 from tenacity import wait_fixed, stop_after_attempt, retry, retry_if_exception_type
 
 from common import guild_level
-from common.autocomplete import get_account_suggestions
+from common.autocomplete import get_account_suggestions, invalidate_suggestions
 from common.constants import Emoji, Time, Preferences
 from common.db import session
 from common.logging import logger
 from datamodels.account_settings import AccountInfo
+from datamodels.code_redemption import CodeRedemption
 from datamodels.genshin_user import GenshinUser, TokenExpiredError
 from datamodels.uid_mapping import UidMapping
 
@@ -136,6 +137,7 @@ class UserManager(commands.Cog):
                 raise e
 
         session.commit()
+        invalidate_suggestions(discord_id)
         messages += ["", "Registration complete!"]
         embed = discord.Embed(description="\n".join(messages))
         embed.set_footer(
@@ -183,10 +185,12 @@ class UserManager(commands.Cog):
             # This assumes we don't have ON DELETE CASCADE as that can be unreliable
             session.execute(delete(UidMapping).where(UidMapping.mihoyo_id == mihoyo_id))
             session.execute(delete(AccountInfo).where(AccountInfo.id == mihoyo_id))
+            session.execute(delete(CodeRedemption).where(CodeRedemption.mihoyo_id == mihoyo_id))
             session.execute(
                 delete(GenshinUser).where(GenshinUser.mihoyo_id == mihoyo_id)
             )
             session.commit()
+            invalidate_suggestions(ctx.author.id)
             await ctx.edit(
                 embed=discord.Embed(description=f"Account deleted"), view=None
             )
@@ -399,6 +403,7 @@ class UidDropdown(discord.ui.Select["UidSettings"]):
             )
 
         session.commit()
+        invalidate_suggestions(interaction.user.id)
 
         await interaction.response.defer()
 
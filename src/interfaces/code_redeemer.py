@@ -0,0 +1,229 @@
+import asyncio
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Set
+
+import aiohttp
+import genshin
+from sqlalchemy import select
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+
+from common.db import session
+from common.logging import logger
+from datamodels.code_redemption import CodeRedemption, RedeemableCode, RedemptionStatus
+from datamodels.genshin_user import GenshinUser
+from utils.rate_limit import RateLimiter
+from utils.worker_pool import run_in_pool
+
+# Shared by everything that redeems codes so that we stay under HoYoverse's global limit.
+redemption_limiter = RateLimiter(rate=2, per=1)
+
+# A job in one of these statuses never needs to be attempted again
+FINAL_STATUSES = [
+    RedemptionStatus.REDEEMED,
+    RedemptionStatus.ALREADY_CLAIMED,
+    RedemptionStatus.INVALID_CODE,
+]
+
+# Errors that say nothing about the code or the account, so the redemption is attempted again later
+RETRYABLE_ERRORS = (
+    genshin.errors.RedemptionCooldown,
+    genshin.errors.TooManyRequests,
+    genshin.errors.VisitsTooFrequently,
+    aiohttp.ClientError,
+    asyncio.TimeoutError,
+)
+
+
+def get_redeemed_accounts(code: str) -> Set[int]:
+    """
+    Returns the Hoyolab IDs of accounts that have already redeemed the code.
+    """
+    return set(
+        session.execute(
+            select(CodeRedemption.mihoyo_id).where(
+                CodeRedemption.code == code,
+                CodeRedemption.status.in_(
+                    [RedemptionStatus.REDEEMED, RedemptionStatus.ALREADY_CLAIMED]
+                ),
+            )
+        ).scalars()
+    )
+
+
+def record_redemption(mihoyo_id: int, code: str, status: str):
+    session.merge(
+        CodeRedemption(
+            mihoyo_id=mihoyo_id, code=code, status=status, updated_at=datetime.utcnow()
+        )
+    )
+    session.commit()
+
+
+class CodeRedeemer:
+    """
+    Redeems codes for many accounts without tripping HoYoverse's rate limits.
+
+    Every (account, code) pair is persisted as a job, so a batch interrupted by a restart is resumed by
+    the next run. An account redeems its codes one at a time since HoYoverse enforces a cooldown between
+    redemptions, while up to WORKERS accounts are processed concurrently.
+    """
+
+    WORKERS = 5
+    ACCOUNT_COOLDOWN = 5  # seconds between two redemptions on the same account
+    MAX_ATTEMPTS = 5
+    RETRY_DELAY = timedelta(minutes=10)  # doubled after every failed attempt
+
+    def __init__(self, workers: int = WORKERS):
+        self.workers = workers
+        self.lock = asyncio.Lock()
+        # When the earliest pending job is due (UTC), so callers can tell without reading the database
+        self.next_run_at: Optional[datetime] = None
+
+    def is_due(self) -> bool:
+        return self.next_run_at is not None and self.next_run_at <= datetime.utcnow()
+
+    def _wake_at(self, when: datetime):
+        if self.next_run_at is None or when < self.next_run_at:
+            self.next_run_at = when
+
+    def enqueue(self, codes: Iterable[str], accounts: Iterable[GenshinUser]):
+        codes = list(codes)
+        done = set(
+            session.execute(
+                select(CodeRedemption.mihoyo_id, CodeRedemption.code).where(
+                    CodeRedemption.code.in_(codes),
+                    CodeRedemption.status.in_(FINAL_STATUSES),
+                )
+            ).all()
+        )
+
+        for account in accounts:
+            for code in codes:
+                if (account.mihoyo_id, code) not in done:
+                    session.merge(
+                        CodeRedemption(
+                            mihoyo_id=account.mihoyo_id,
+                            code=code,
+                            status=RedemptionStatus.PENDING,
+                            updated_at=datetime.utcnow(),
+                        )
+                    )
+                    self._wake_at(datetime.utcnow())
+
+        session.commit()
+
+    async def run(self) -> Counter:
+        """
+        Processes all pending jobs that are due, including the ones left over from a previous run.
+
+        :return: The number of jobs that ended up in each status.
+        """
+        async with self.lock:
+            jobs = defaultdict(list)
+            now = datetime.utcnow()
+            self.next_run_at = None
+            for job in session.execute(
+                select(CodeRedemption)
+                .where(CodeRedemption.status == RedemptionStatus.PENDING)
+                .order_by(CodeRedemption.code)
+            ).scalars():
+                if job.retry_at and job.retry_at > now:
+                    self._wake_at(job.retry_at)
+                else:
+                    jobs[job.mihoyo_id].append(job)
+
+            results = Counter()
+            invalid_codes = set()
+
+            async def redeem_account(account_jobs: List[CodeRedemption]):
+                try:
+                    await self._redeem_for_account(account_jobs, invalid_codes, results)
+                except Exception:
+                    logger.exception(f"Cannot redeem codes for {account_jobs[0].mihoyo_id}")
+
+            await run_in_pool(jobs.values(), redeem_account, self.workers)
+
+            return results
+
+    async def _redeem_for_account(self, jobs: List[CodeRedemption], invalid_codes: set, results: Counter):
+        account = session.get(GenshinUser, (jobs[0].mihoyo_id,))
+        client = account.client if account and account.mihoyo_token else None
+        redeemed_before = False
+
+        for job in jobs:
+            if not client:
+                status = RedemptionStatus.FAILED
+            elif job.code in invalid_codes:
+                status = RedemptionStatus.INVALID_CODE
+            else:
+                if redeemed_before:
+                    await asyncio.sleep(self.ACCOUNT_COOLDOWN)
+                logger.info(f"Redeeming code {job.code} for account {job.mihoyo_id}")
+                try:
+                    status = await self.redeem(client, job.code)
+                except genshin.errors.InvalidCookies:
+                    # Unlike other failures, this affects all remaining codes of the account
+                    logger.warning(f"Cookies of account {job.mihoyo_id} are no longer valid")
+                    status = RedemptionStatus.FAILED
+                    client = None
+                except RETRYABLE_ERRORS:
+                    logger.warning(f"Cannot redeem code {job.code} for {job.mihoyo_id} right now", exc_info=True)
+                    status = self._schedule_retry(job)
+                redeemed_before = True
+
+            if status == RedemptionStatus.INVALID_CODE and job.code not in invalid_codes:
+                invalid_codes.add(job.code)
+                session.merge(RedeemableCode(code=job.code, working=False))
+                logger.info(f"Code {job.code} expired. Updating database")
+
+            job.status = status
+            job.updated_at = datetime.utcnow()
+            session.commit()
+            results[status] += 1
+
+    def _schedule_retry(self, job: CodeRedemption) -> str:
+        """
+        Puts a job back in the queue with exponential backoff, or gives up after MAX_ATTEMPTS.
+
+        :return: The new status of the job.
+        """
+        job.attempts = (job.attempts or 0) + 1
+        if job.attempts >= self.MAX_ATTEMPTS:
+            return RedemptionStatus.FAILED
+
+        job.retry_at = datetime.utcnow() + self.RETRY_DELAY * 2 ** (job.attempts - 1)
+        self._wake_at(job.retry_at)
+        return RedemptionStatus.PENDING
+
+    async def redeem(self, client: genshin.Client, code: str, uid: int = None) -> str:
+        """
+        Redeems a single code, retrying while the account is on redemption cooldown.
+
+        :return: A RedemptionStatus value.
+        :raises genshin.errors.InvalidCookies: If the account's cookie_token is no longer valid.
+        :raises RETRYABLE_ERRORS: If the code couldn't be redeemed for reasons that may go away later.
+        """
+        try:
+            await self._redeem_with_retry(client, code, uid)
+            return RedemptionStatus.REDEEMED
+        except (genshin.errors.InvalidCookies, *RETRYABLE_ERRORS):
+            # Mostly subclasses of GenshinException, so they have to be let through before the catch-all below
+            raise
+        except genshin.errors.RedemptionClaimed:
+            return RedemptionStatus.ALREADY_CLAIMED
+        except genshin.errors.RedemptionInvalid:
+            return RedemptionStatus.INVALID_CODE
+        except genshin.errors.GenshinException:
+            logger.exception(f"Cannot redeem code {code}")
+            return RedemptionStatus.FAILED
+
+    @retry(
+        retry=retry_if_exception_type(genshin.errors.RedemptionCooldown),
+        stop=stop_after_attempt(5),
+        wait=wait_exponential(multiplier=ACCOUNT_COOLDOWN, max=120),
+        reraise=True,
+    )
+    async def _redeem_with_retry(self, client: genshin.Client, code: str, uid: int = None):
+        await redemption_limiter.acquire()
+        await client.redeem_code(code, uid=uid)
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import re
+from typing import Dict, List, Set
+
+import aiohttp
+from lxml import html
+
+from common import conf
+from common.logging import logger
+from utils.http_cache import conditional_get
+
+CODE_REGEX = r"^[A-Za-z0-9]{10,20}$"
+
+
+class CodeSource:
+    """
+    A web page listing redeemable codes. To support a new site, subclass this, implement `parse`
+    and add it to `get_code_sources`.
+    """
+
+    TIMEOUT = 15  # seconds, so that a slow site can't hold up the others
+
+    def __init__(self, url: str, headers: Dict[str, str] = None):
+        self.url = url
+        self.headers = headers or {}
+        self.codes: Set[str] = set()
+        self.parsed = False
+
+    def parse(self, body: bytes) -> Set[str]:
+        """
+        Implement this to extract the codes from the page content.
+        """
+        raise NotImplementedError()
+
+    async def fetch(self, http: aiohttp.ClientSession) -> Set[str]:
+        """
+        Returns the codes listed on this source, only parsing the page again if its content has changed.
+        If the source can't be reached or parsed, the codes found last time are returned.
+        """
+        try:
+            body, changed = await conditional_get(
+                http, self.url, headers=self.headers, timeout=aiohttp.ClientTimeout(total=self.TIMEOUT)
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            logger.warning(f"Cannot fetch codes from {self.url}")
+            return self.codes
+
+        if changed or not self.parsed:
+            try:
+                self.codes = self.parse(body)
+            except Exception:
+                # Parsed again next time, since the page would otherwise look unchanged
+                logger.exception(f"Cannot parse codes from {self.url}")
+                self.parsed = False
+            else:
+                self.parsed = True
+
+        return self.codes
+
+
+class PocketTacticsSource(CodeSource):
+    URL = "https://www.pockettactics.com/genshin-impact/codes"
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
+    }
+
+    def __init__(self):
+        super().__init__(self.URL, self.HEADERS)
+
+    def parse(self, body: bytes) -> Set[str]:
+        codes = set()
+
+        # Parse the HTML with lxml
+        tree = html.fromstring(body)
+
+        # Find the desired elements
+        content_div = tree.xpath('//div[@class="entry-content"]')
+        if content_div:
+            for ul in content_div[0].xpath('.//ul'):
+                for code in ul.xpath('.//strong'):
+                    code_text = code.text_content().strip()
+                    if re.match(CODE_REGEX, code_text):
+                        codes.add(code_text)
+                # Stops at the first block of valid codes
+                if codes:
+                    break
+
+        return codes
+
+
+class TextSource(CodeSource):
+    """
+    Supports extracting codes from the following format:
+     - Line-by-line codes
+     - JSON (from https://ataraxyaffliction.github.io/)
+    """
+
+    def parse(self, body: bytes) -> Set[str]:
+        data = body.decode("utf-8")
+
+        try:
+            obj = json.loads(data)
+        except json.JSONDecodeError:
+            potential_codes = data.splitlines()
+        else:
+            potential_codes = [item["code"] for item in obj]
+
+        return {code.strip() for code in potential_codes if re.match(CODE_REGEX, code.strip())}
+
+
+def get_code_sources() -> List[CodeSource]:
+    return [PocketTacticsSource()] + [TextSource(url) for url in conf.CODE_URL]
+
+
+async def fetch_codes(http: aiohttp.ClientSession, sources: List[CodeSource]) -> Set[str]:
+    """
+    Fetches all sources concurrently and returns the union of their codes.
+    """
+    results = await asyncio.gather(*(source.fetch(http) for source in sources))
+    return set().union(*results)
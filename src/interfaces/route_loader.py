@@ -1,39 +1,44 @@
 from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
 
 import discord
+from sqlalchemy import select, delete
+from yarl import URL
 
 from common import conf
+from common.db import session
+from common.logging import logger
+from datamodels.farm_route import RouteImage, RouteChannel
+
+# Discord attachment urls are signed and expire, so urls expiring within this margin are refreshed before use
+URL_REFRESH_MARGIN = timedelta(hours=1)
 
 _route_images = defaultdict(list)
+# Replaced rather than modified when the index changes, so autocomplete can tell when to rebuild its index
+_route_options: Tuple[str, ...] = ()
 
 
 def get_route_options(_):
-    return list(_route_images.keys())
+    return _route_options
 
 
 def get_route_images(resource: str):
     return _route_images[resource]
 
 
-async def load_images(bot: discord.Bot):
-    routes = defaultdict(list)
-    route_count = 0
-
-    files = []
+def build_index(files: List[Tuple[str, str]]):
+    """
+    Groups route images by material. Images named <name>.<idx>.png are ordered by their index.
 
-    for route_channel_id in conf.ROUTE_CHANNEL_IDS:
-        channel = await bot.fetch_channel(route_channel_id)
-        async for message in channel.history(limit=500):
-            if message.attachments:
-                for attachment in message.attachments:
-                    if "image" in attachment.content_type:
-                        filename = attachment.filename.replace("_", " ")
-                        files.append((filename, attachment.url))
+    :param files: (filename, url) of every route image.
+    """
+    global _route_options
 
+    routes = defaultdict(list)
     filename_lookup = {filename for filename, url in files}
-    files.sort()
 
-    for i, (filename, url) in enumerate(files):
+    for filename, url in sorted(files):
         components = filename.rsplit(".", 2)
 
         if len(components) == 3:
@@ -52,10 +57,141 @@ async def load_images(bot: discord.Bot):
 
         material_name = components[0]
         routes[material_name].append(components[1:])
-        route_count += 1
 
     _route_images.clear()
     for material in routes:
         _route_images[material] = [url for index, url in sorted(routes[material])]
+    _route_options = tuple(_route_images.keys())
+
+
+def load_cached_images() -> int:
+    """
+    Builds the route index from the images stored in the database, without calling Discord.
+    """
+    files = session.execute(select(RouteImage.filename, RouteImage.url)).all()
+    build_index([(filename, url) for filename, url in files])
+    return len(files)
+
+
+def _url_expires_at(url: str) -> Optional[datetime]:
+    """
+    Returns when a signed Discord attachment url expires (UTC), or None if it doesn't.
+    """
+    expiry = URL(url).query.get("ex")
+    try:
+        return datetime.utcfromtimestamp(int(expiry, 16)) if expiry else None
+    except ValueError:
+        return None
+
+
+async def get_fresh_route_images(bot: discord.Bot, resource: str) -> List[str]:
+    """
+    Returns the route images of a resource, first refreshing the urls that are about to expire
+    by reading their messages again.
+    """
+    deadline = datetime.utcnow() + URL_REFRESH_MARGIN
+    stale_urls = []
+    for url in get_route_images(resource):
+        expires_at = _url_expires_at(url)
+        if expires_at and expires_at < deadline:
+            stale_urls.append(url)
+    if not stale_urls:
+        return get_route_images(resource)
+
+    messages = set(
+        session.execute(
+            select(RouteImage.channel_id, RouteImage.message_id).where(RouteImage.url.in_(stale_urls))
+        ).all()
+    )
+    for channel_id, message_id in messages:
+        try:
+            channel = bot.get_channel(channel_id) or await bot.fetch_channel(channel_id)
+            message = await channel.fetch_message(message_id)
+        except discord.NotFound:
+            remove_message(message_id)
+            continue
+        except discord.HTTPException:
+            logger.warning(f"Cannot refresh route images of message {message_id}", exc_info=True)
+            continue
+        _store_images(message)
+    session.commit()
+
+    load_cached_images()
+    return get_route_images(resource)
+
+
+def add_message(message: discord.Message, move_watermark: bool = True) -> int:
+    """
+    Stores the route images of a message and, unless told otherwise, moves the watermark of its channel past it.
+    The index has to be rebuilt afterwards.
+    """
+    count = _store_images(message)
+    if move_watermark:
+        _move_watermark(message.channel.id, message.id)
+    session.commit()
+
+    return count
+
+
+def _store_images(message: discord.Message) -> int:
+    count = 0
+    for attachment in message.attachments:
+        if attachment.content_type and "image" in attachment.content_type:
+            session.merge(
+                RouteImage(
+                    attachment_id=attachment.id,
+                    message_id=message.id,
+                    channel_id=message.channel.id,
+                    filename=attachment.filename.replace("_", " "),
+                    url=attachment.url,
+                )
+            )
+            count += 1
+    return count
+
+
+def _move_watermark(channel_id: int, message_id: int):
+    watermark = session.get(RouteChannel, (channel_id,))
+    if not watermark or watermark.last_message_id < message_id:
+        session.merge(RouteChannel(channel_id=channel_id, last_message_id=message_id))
+
+
+def remove_message(message_id: int) -> bool:
+    """
+    Forgets the route images of a deleted message. Returns whether the index needs to be rebuilt.
+    """
+    result = session.execute(delete(RouteImage).where(RouteImage.message_id == message_id))
+    session.commit()
+    return result.rowcount > 0
+
+
+async def load_images(bot: discord.Bot, full: bool = False) -> int:
+    """
+    Reads the messages posted in the route channels since they were last read and rebuilds the index.
+
+    :param full: Forget everything stored and read the channels again.
+    :return: The number of route images in the index.
+    """
+    if full:
+        session.execute(delete(RouteImage))
+        session.execute(delete(RouteChannel))
+        session.commit()
 
-    return route_count
+    for route_channel_id in conf.ROUTE_CHANNEL_IDS:
+        channel = bot.get_channel(route_channel_id) or await bot.fetch_channel(
+            route_channel_id
+        )
+        watermark = session.get(RouteChannel, (route_channel_id,))
+        after = discord.Object(id=watermark.last_message_id) if watermark else None
+
+        # Committed once per channel, so an interrupted read starts over from the previous watermark
+        last_message_id = None
+        async for message in channel.history(limit=500, after=after):
+            _store_images(message)
+            last_message_id = max(last_message_id or 0, message.id)
+
+        if last_message_id:
+            _move_watermark(route_channel_id, last_message_id)
+        session.commit()
+
+    return load_cached_images()
@@ -1,27 +1,22 @@
-from collections import defaultdict
-
 import discord
 from discord.ext import commands
 from discord.ext.commands import Command
-from sqlalchemy import select
 
-from common import conf, db
-from common.db import session
+from common import conf, db, guild_settings
 from common.logging import logger
 from datamodels import Base
-from datamodels.guild_settings import GuildSettings, GuildSettingKey
+from datamodels.guild_settings import GuildSettingKey
 from handlers import all_handlers, prefix_commands
 from scheduling import dispatcher
 from utils.unified_context import UnifiedContext
 
 DEFAULT_PREFIX = "!"
-guild_prefix_lookup = defaultdict(lambda: DEFAULT_PREFIX)
 
 
 # Custom command prefix for each guild
 def get_prefix(bot: discord.Bot, message: discord.Message):
     if message.guild:
-        prefix = guild_prefix_lookup[message.guild.id]
+        prefix = guild_settings.get_value(message.guild.id, GuildSettingKey.COMMAND_PREFIX) or DEFAULT_PREFIX
     else:
         prefix = DEFAULT_PREFIX
     return commands.when_mentioned(bot, message) + [prefix]
@@ -34,11 +29,6 @@ bot = commands.Bot(command_prefix=get_prefix)
 async def on_ready():
     await bot.change_presence(activity=discord.Game(name="Genshin Impact"))
 
-    for setting in session.execute(
-            select(GuildSettings).where(GuildSettings.key == GuildSettingKey.COMMAND_PREFIX)
-    ).scalars():
-        guild_prefix_lookup[setting.guild_id] = setting.value
-
 
 @bot.event
 async def on_application_command_error(ctx, error):
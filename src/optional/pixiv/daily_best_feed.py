@@ -1,91 +1,200 @@
 import asyncio
 import datetime
-import os
-import tempfile
+import functools
+from io import BytesIO
+from typing import List, Optional
 
 import discord
 from dateutil.relativedelta import relativedelta
 from discord.ext import commands, tasks
 from pixivpy3 import AppPixivAPI
+from sqlalchemy import select
 
 from common import conf
 from common.db import session
 from common.logging import logger
 from optional.pixiv.illust_model import Illust
+from utils.announcements import get_channel
+
+
+def is_sorted_by_popularity(result) -> Optional[bool]:
+    """
+    Sorting by popularity needs Pixiv premium. Without it, the search either fails or isn't sorted.
+    Returns None when there are too few illusts to tell.
+    """
+    if result.get("error"):
+        return False
+
+    bookmarks = [illust.total_bookmarks for illust in result.illusts]
+    if len(bookmarks) < 2:
+        return None
+    return all(a >= b for a, b in zip(bookmarks, bookmarks[1:]))
 
 
 class DailyBestIllustFeed(commands.Cog):
+    MAX_CONCURRENT_DOWNLOADS = 4
+    BOOKMARK_THRESHOLD = 1000
+    SEARCH_DAYS = 3
+    MAX_PAGES = 200  # per run, across all searched days
+
     def __init__(self, bot: discord.Bot = None):
         self.bot = bot
         self.start_up = False
         self.api = AppPixivAPI()
         self.blocked_tags = []
         self.model = None
+        self.download_semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_DOWNLOADS)
+
+        # None until a search shows whether the account can sort by popularity
+        self.popular_sort: Optional[bool] = None
+        self.pages_left = 0
 
     @commands.Cog.listener()
     async def on_ready(self):
         if not self.start_up:
             self.start_up = True
-            self.api.auth(refresh_token=conf.PIXIV_REFRESH_TOKEN)
+            await self.call_api(self.api.auth, refresh_token=conf.PIXIV_REFRESH_TOKEN)
             self.blocked_tags = set(conf.PIXIV_BLOCKED_TAGS)
             self.job.start()
 
+    async def call_api(self, func, *args, **kwargs):
+        """
+        pixivpy is synchronous, so its calls run in an executor to keep the event loop free.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(func, *args, **kwargs)
+        )
+
+    async def download(self, url: str) -> BytesIO:
+        async with self.download_semaphore:
+            image = BytesIO()
+            await self.call_api(self.api.download, url, fname=image)
+            image.seek(0)
+            return image
+
     @tasks.loop(hours=8)
     async def job(self):
         logger.info(f"Checking Pixiv")
-        result = self.api.search_illust(
-            "原神",
+        feed_channel = await get_channel(self.bot, int(conf.PIXIV_CHANNEL_ID))
+
+        today = datetime.date.today()
+        self.pages_left = self.MAX_PAGES
+        most_popular = 0
+        # Oldest first, since it won't be in the search window again
+        for days_ago in range(self.SEARCH_DAYS, -1, -1):
+            if self.pages_left <= 0:
+                logger.warn("Pixiv page budget used up before scanning all days")
+                break
+            most_popular += await self.scan_day(feed_channel, today - relativedelta(days=days_ago))
+
+        logger.info(f"Found {most_popular} illusts with given filters")
+
+    async def search_page(self, **kwargs):
+        self.pages_left -= 1
+        return await self.call_api(self.api.search_illust, **kwargs)
+
+    async def search(self, day: datetime.date, sort: str):
+        return await self.search_page(
+            word="原神",
             search_target="partial_match_for_tags",
-            sort="date_asc",
-            start_date=(datetime.datetime.today() - relativedelta(days=3)).strftime("%Y-%m-%d"),
-            end_date=datetime.datetime.today().strftime("%Y-%m-%d"))
-
-        feed_channel = await self.bot.fetch_channel(conf.PIXIV_CHANNEL_ID)
-        most_popular = []
-        for page in range(200):
-            logger.info(f"Fetching Pixiv page {page}")
-            for illust in result.illusts:
-                try:
-                    if illust.x_restrict or illust.sanity_level > 3 or illust.total_bookmarks < 1000:
-                        continue
-                    has_blocked_tag = any(word in self.blocked_tags
-                                          for tag in illust.tags
-                                          for word in (tag.name + " " + (tag.translated_name or "")).split())
-                    most_popular.append(illust)
-
-                    record = session.get(Illust, (illust.id))
-                    if not record:
-                        filepath, ext = os.path.splitext(illust.image_urls.large)
-
-                        with tempfile.NamedTemporaryFile(suffix=ext) as tmp:
-                            image_url = illust.image_urls.large
-                            self.api.download(image_url, fname=tmp)
-                            url = f"https://www.pixiv.net/en/artworks/{illust.id}"
-                            logger.info(f"Send to feed channel: {url}")
-                            if has_blocked_tag:
-                                await feed_channel.send(f"||{url}||")
-                            else:
-                                embed = discord.Embed(
-                                    title=illust.title,
-                                    description=url)
-                                embed.set_author(name=illust.user.name)
-                                file = discord.File(tmp.name, filename=f"{illust.id}.png")
-                                embed.set_image(url=f"attachment://{illust.id}.png")
-                                await feed_channel.send(embed=embed, file=file)
-
-                        new_record = Illust(id=illust.id)
-                        session.add(new_record)
-                        session.commit()
-                except Exception:
-                    logger.exception(illust)
+            sort=sort,
+            start_date=day.strftime("%Y-%m-%d"),
+            end_date=day.strftime("%Y-%m-%d"))
+
+    async def scan_day(self, feed_channel: discord.abc.Messageable, day: datetime.date) -> int:
+        """
+        Posts the popular illusts of a day. When sorting by popularity is available,
+        paging stops at the first illust below the bookmark threshold since the rest can only have fewer.
+
+        :return: The number of illusts that passed the filters.
+        """
+        if self.popular_sort is False:
+            result = await self.search(day, "date_asc")
+        else:
+            result = await self.search(day, "popular_desc")
+            if self.popular_sort is None:
+                self.popular_sort = is_sorted_by_popularity(result)
+                if self.popular_sort is not None:
+                    logger.info(f"Pixiv popularity sort is {'' if self.popular_sort else 'not '}available")
+            if self.popular_sort is False:
+                result = await self.search(day, "date_asc")
+
+        most_popular = 0
+        page = 0
+        while True:
+            logger.info(f"Fetching Pixiv page {page} for {day}")
+            most_popular += await self.post_illusts(feed_channel, result.illusts)
+
+            if (
+                self.popular_sort
+                and result.illusts
+                and result.illusts[-1].total_bookmarks < self.BOOKMARK_THRESHOLD
+            ):
+                break
 
             next_qs = self.api.parse_qs(result.next_url)
             if next_qs is None:
                 break
 
-            result = self.api.search_illust(**next_qs)
+            if self.pages_left <= 0:
+                logger.warn("Loop ends without expected break (Too many illusts)")
+                break
+
+            result = await self.search_page(**next_qs)
+            page += 1
             await asyncio.sleep(1)
-        else:
-            logger.warn("Loop ends without expected break (Too many illusts)")
 
-        logger.info(f"Found {len(most_popular)} illusts with given filters")
+        return most_popular
+
+    def has_blocked_tag(self, illust) -> bool:
+        return any(word in self.blocked_tags
+                   for tag in illust.tags
+                   for word in (tag.name + " " + (tag.translated_name or "")).split())
+
+    async def post_illusts(self, feed_channel: discord.abc.Messageable, illusts: List) -> int:
+        """
+        Posts the illusts of a search page that pass the filters and haven't been posted yet.
+        Images are downloaded concurrently while earlier ones are being posted.
+
+        :return: The number of illusts that passed the filters.
+        """
+        most_popular = [
+            illust for illust in illusts
+            if not (illust.x_restrict or illust.sanity_level > 3 or illust.total_bookmarks < self.BOOKMARK_THRESHOLD)
+        ]
+        posted = set(
+            session.execute(
+                select(Illust.id).where(Illust.id.in_([illust.id for illust in most_popular]))
+            ).scalars()
+        )
+        new_illusts = [illust for illust in most_popular if illust.id not in posted]
+
+        # Blocked illusts are only posted as a spoilered link, so they don't need the image
+        downloads = {
+            illust.id: asyncio.create_task(self.download(illust.image_urls.large))
+            for illust in new_illusts
+            if not self.has_blocked_tag(illust)
+        }
+
+        for illust in new_illusts:
+            try:
+                url = f"https://www.pixiv.net/en/artworks/{illust.id}"
+                logger.info(f"Send to feed channel: {url}")
+                if illust.id not in downloads:
+                    await feed_channel.send(f"||{url}||")
+                else:
+                    image = await downloads[illust.id]
+                    embed = discord.Embed(
+                        title=illust.title,
+                        description=url)
+                    embed.set_author(name=illust.user.name)
+                    file = discord.File(image, filename=f"{illust.id}.png")
+                    embed.set_image(url=f"attachment://{illust.id}.png")
+                    await feed_channel.send(embed=embed, file=file)
+
+                session.add(Illust(id=illust.id))
+                session.commit()
+            except Exception:
+                logger.exception(illust)
+
+        return len(most_popular)
@@ -0,0 +1,127 @@
+import datetime
+from typing import Optional
+
+import discord
+import pytz
+from sqlalchemy import select
+
+from common import guild_settings
+from common.db import session
+from common.logging import logger
+from datamodels.birthday import Birthday
+from datamodels.guild_settings import GuildSettingKey
+from datamodels.scheduling import ScheduledItem
+from scheduling.types import ScheduleType
+from utils.announcements import get_channel
+
+
+def next_birthday_at(
+    month: int, day: int, timezone: str, now: datetime.datetime
+) -> datetime.datetime:
+    """
+    Returns when the upcoming birthday starts in UTC, or when it started if it's the birthday right now.
+    February 29th birthdays only happen on leap years.
+
+    :param now: A timezone-aware datetime.
+    """
+    tz = pytz.timezone(timezone)
+    today = now.astimezone(tz).date()
+
+    year = today.year
+    while True:
+        try:
+            date = datetime.date(year=year, month=month, day=day)
+        except ValueError:
+            date = None
+
+        if date and date >= today:
+            return tz.localize(datetime.datetime.combine(date, datetime.time())).astimezone(pytz.UTC)
+        year += 1
+
+
+def schedule_reminder(discord_id: int):
+    """
+    Schedules the reminder for the next birthday of a user across all guilds,
+    or removes it if the user has no birthday set anymore.
+    """
+    now = datetime.datetime.now(pytz.UTC)
+    next_run = min(
+        (
+            next_birthday_at(bday.month, bday.day, bday.timezone, now)
+            for bday in session.execute(
+                select(Birthday).where(Birthday.discord_id == discord_id)
+            ).scalars()
+        ),
+        default=None,
+    )
+
+    if next_run:
+        session.merge(
+            ScheduledItem(
+                id=discord_id,
+                type=ScheduleType.BIRTHDAY,
+                scheduled_at=next_run.replace(tzinfo=None),
+                done=False,
+            )
+        )
+    else:
+        task = session.get(ScheduledItem, (discord_id, ScheduleType.BIRTHDAY))
+        if task:
+            session.delete(task)
+    session.commit()
+
+
+async def task_handler(
+    bot: discord.Bot, scheduled_task: ScheduledItem
+) -> Optional[datetime.datetime]:
+    """
+    Reminds every guild where the user's birthday has started, then returns when the next one starts.
+    """
+    now = datetime.datetime.now(pytz.UTC)
+    next_runs = []
+
+    for bday in session.execute(
+        select(Birthday).where(Birthday.discord_id == scheduled_task.id)
+    ).scalars():
+        if next_birthday_at(bday.month, bday.day, bday.timezone, now) <= now:
+            try:
+                await remind(bot, bday)
+            except Exception:
+                logger.exception(
+                    f"Cannot send birthday reminder for {bday.discord_id} in {bday.guild_id}"
+                )
+            tomorrow = now + datetime.timedelta(days=1)
+            next_runs.append(
+                next_birthday_at(bday.month, bday.day, bday.timezone, tomorrow)
+            )
+        else:
+            next_runs.append(next_birthday_at(bday.month, bday.day, bday.timezone, now))
+
+    if next_runs:
+        return min(next_runs).replace(tzinfo=None)
+
+
+async def remind(bot: discord.Bot, bday: Birthday):
+    if bday.reminded_at and (datetime.datetime.utcnow() - bday.reminded_at).days < 180:
+        return
+
+    logger.info(f"Today is {bday.discord_id}'s birthday!")
+
+    guild = bot.get_guild(bday.guild_id)
+    channel_id = guild_settings.get_value(bday.guild_id, GuildSettingKey.BOT_CHANNEL)
+
+    if not guild:
+        logger.warning(f"Guild {bday.guild_id} is not available")
+        return
+
+    if not channel_id:
+        logger.warning(f"Channel ID not set for guild {guild.name}:{guild.id}")
+        return
+
+    channel = await get_channel(bot, int(channel_id))
+    member = guild.get_member(bday.discord_id) or await guild.fetch_member(bday.discord_id)
+
+    await channel.send(f":birthday: Today is {member.mention}'s birthday!")
+
+    bday.reminded_at = datetime.datetime.utcnow()
+    session.commit()
@@ -1,6 +1,6 @@
 import asyncio
 from datetime import datetime
-from typing import Iterable
+from typing import Dict, Iterable, Tuple
 
 import discord
 from dateutil.relativedelta import relativedelta
@@ -10,7 +10,7 @@ from sqlalchemy import select
 from common.db import session
 from common.logging import logger
 from datamodels.scheduling import ScheduledItem
-from scheduling import parametric_transformer
+from scheduling import parametric_transformer, birthday
 from scheduling.types import ScheduleType
 
 
@@ -18,11 +18,14 @@ class Dispatcher(commands.Cog):
     task_interval = 60
     supported_handlers = {
         ScheduleType.PARAMETRIC_TRANSFORMER: parametric_transformer.task_handler,
+        ScheduleType.BIRTHDAY: birthday.task_handler,
     }
 
     def __init__(self, bot: discord.Bot):
         self.bot = bot
         self.start_up = False
+        # Tasks being dispatched, so a slow handler isn't started again by the next run of the job
+        self.running: Dict[Tuple[int, str], asyncio.Task] = {}
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -48,18 +51,26 @@ class Dispatcher(commands.Cog):
             .all()
         )
 
-        # Sleep until the earliest task is ready
+        # Each task waits and runs on its own, so a slow handler doesn't hold up the others
         for task in scheduled_tasks:
-            scheduled_at = task.scheduled_at
-            wait_time = max((scheduled_at - datetime.utcnow()).total_seconds(), 0)
-            await asyncio.sleep(wait_time)
+            key = (task.id, task.type)
+            if key not in self.running:
+                self.running[key] = asyncio.create_task(self.dispatch(task))
+                self.running[key].add_done_callback(lambda _, key=key: self.running.pop(key, None))
 
-            try:
-                logger.info(f"Dispatching task: {task.id}, {task.type}")
-                await self.supported_handlers[task.type](self.bot, task)
+    async def dispatch(self, task: ScheduledItem):
+        wait_time = max((task.scheduled_at - datetime.utcnow()).total_seconds(), 0)
+        await asyncio.sleep(wait_time)
+
+        try:
+            logger.info(f"Dispatching task: {task.id}, {task.type}")
+            # A handler may return the next time (UTC) the task should run again
+            next_run = await self.supported_handlers[task.type](self.bot, task)
+            if next_run:
+                task.scheduled_at = next_run
+            else:
                 task.done = True
-                session.merge(task)
-                session.commit()
-            except Exception:
-                logger.exception("Task failed to dispatch")
-                pass
+            session.merge(task)
+            session.commit()
+        except Exception:
+            logger.exception("Task failed to dispatch")
@@ -9,6 +9,7 @@ from datamodels.genshin_user import GenshinUser
 from datamodels.scheduling import ScheduledItem
 from datamodels.uid_mapping import UidMapping
 from resources import RESOURCE_PATH
+from utils import notifications
 from utils.game_notes import get_notes
 
 
@@ -38,10 +39,15 @@ async def send_reminder(
         return
 
     uid = scheduled_task.id
-    discord_user = await bot.fetch_user(account.discord_id)
-    channel = await discord_user.create_dm()
-
-    await channel.send(
-        f"Your parametric transformer is now ready. `UID {uid}`\n",
+    embed = discord.Embed(
+        title="Your parametric transformer is now ready!",
+        description=f"UID: {uid}",
+        color=0xFF1100,
+    )
+    embed.set_footer(text="You can turn this notification off in /user settings")
+    await notifications.send_reminder(
+        bot,
+        account.discord_id,
+        embed,
         file=discord.File(str(RESOURCE_PATH / "transformer_guide.png")),
     )
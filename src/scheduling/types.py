@@ -7,3 +7,6 @@ class ScheduleType:
 
     # Remind to do a task every so often
     REPEAT = "recurrent"
+
+    # Announce a user's birthday in the guilds they've set it in
+    BIRTHDAY = "birthday"
@@ -0,0 +1,54 @@
+import asyncio
+from typing import Dict
+
+import discord
+from common import guild_settings
+from common.logging import logger
+from utils.rate_limit import RateLimiter
+
+MAX_CONCURRENT_SENDS = 10
+
+# Stays well below Discord's global limit of 50 requests per second
+announcement_limiter = RateLimiter(rate=20, per=1)
+
+_fetched_channels: Dict[int, discord.abc.Messageable] = {}
+
+
+async def get_channel(bot: discord.Bot, channel_id: int) -> discord.abc.Messageable:
+    """
+    Resolves a channel from the gateway cache, only falling back to an HTTP request for unknown channels.
+    """
+    channel = bot.get_channel(channel_id) or _fetched_channels.get(channel_id)
+
+    if not channel:
+        channel = _fetched_channels[channel_id] = await bot.fetch_channel(channel_id)
+
+    return channel
+
+
+async def announce(bot: discord.Bot, channel_key: str, role_key: str, embed: discord.Embed):
+    """
+    Sends an embed to every guild that configured a channel for it, concurrently.
+
+    :param bot: The discord bot object.
+    :param channel_key: The guild setting holding the channel to announce in.
+    :param role_key: The guild setting holding the role to mention, if any.
+    :param embed: The announcement.
+    """
+    channels = guild_settings.get_values(channel_key)
+    roles = guild_settings.get_values(role_key)
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_SENDS)
+
+    async def send(guild_id: int, channel_id: str):
+        async with semaphore:
+            try:
+                channel = await get_channel(bot, int(channel_id))
+                await announcement_limiter.acquire()
+                await channel.send(
+                    content=f"\n<@&{roles[guild_id]}>" if guild_id in roles else None,
+                    embed=embed,
+                )
+            except Exception:
+                logger.exception(f"Cannot send announcement to guild {guild_id}")
+
+    await asyncio.gather(*(send(guild_id, channel_id) for guild_id, channel_id in channels.items()))
@@ -1,12 +1,33 @@
-from urllib.request import urlopen
+import asyncio
+from typing import Dict
 
-from lxml.html import parse
+import aiohttp
+from lxml.html import document_fromstring, HtmlElement
+
+from utils.http_cache import conditional_get
+
+_pages: Dict[str, HtmlElement] = {}
 
 
 class HtmlParser:
-    def __init__(self, url: str):
+    def __init__(self, url: str, page: HtmlElement):
         self.url = url
-        self.page = parse(urlopen(url)).getroot()
+        self.page = page
+
+    @classmethod
+    async def fetch(cls, url: str) -> "HtmlParser":
+        """
+        Downloads and parses a page without blocking the event loop.
+        The parsed page is reused as long as the server reports it as not modified.
+        """
+        async with aiohttp.ClientSession() as http:
+            body, changed = await conditional_get(http, url)
+
+        if changed or url not in _pages:
+            loop = asyncio.get_running_loop()
+            _pages[url] = await loop.run_in_executor(None, document_fromstring, body)
+
+        return cls(url, _pages[url])
 
     @property
     def xpath(self):
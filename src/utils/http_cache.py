@@ -0,0 +1,53 @@
+import dataclasses
+import hashlib
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+
+
+@dataclasses.dataclass
+class CachedResponse:
+    body: bytes
+    digest: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+_responses: Dict[str, CachedResponse] = {}
+
+
+async def conditional_get(http: aiohttp.ClientSession, url: str, **kwargs) -> Tuple[bytes, bool]:
+    """
+    GET a url, sending the validators (ETag/Last-Modified) of the previous response so the server
+    can answer with 304 Not Modified instead of the full body. Servers that don't support validators
+    are handled by comparing a hash of the content.
+
+    :param http: The aiohttp session to send the request with.
+    :param url: The url to fetch.
+    :param kwargs: Extra arguments passed to `session.get`.
+    :return: A tuple of the response body and whether it changed since the last call.
+    """
+    cached = _responses.get(url)
+    headers = dict(kwargs.pop("headers", None) or {})
+
+    if cached:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+
+    async with http.get(url, headers=headers, **kwargs) as response:
+        if cached and response.status == 304:
+            return cached.body, False
+
+        response.raise_for_status()
+        body = await response.read()
+
+        _responses[url] = CachedResponse(
+            body=body,
+            digest=hashlib.sha256(body).hexdigest(),
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+
+    return body, not cached or cached.digest != _responses[url].digest
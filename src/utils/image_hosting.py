@@ -0,0 +1,36 @@
+import io
+from typing import Dict
+
+import discord
+
+from common import conf
+
+# Discord allows at most this many attachments per message
+MAX_ATTACHMENTS_PER_MESSAGE = 10
+
+
+async def upload_images(bot: discord.Bot, images: Dict[str, bytes]) -> Dict[str, str]:
+    """
+    Uploads images to the image hosting channel, packing up to 10 of them into each message.
+
+    :param bot: The discord bot object.
+    :param images: A mapping of unique filenames to image content.
+    :return: A mapping of the same filenames to their hosted urls.
+    """
+    channel = bot.get_channel(conf.IMAGE_HOSTING_CHANNEL_ID) or await bot.fetch_channel(
+        conf.IMAGE_HOSTING_CHANNEL_ID
+    )
+    filenames = list(images)
+    urls = {}
+
+    for i in range(0, len(filenames), MAX_ATTACHMENTS_PER_MESSAGE):
+        batch = filenames[i:i + MAX_ATTACHMENTS_PER_MESSAGE]
+        message = await channel.send(
+            files=[discord.File(io.BytesIO(images[filename]), filename=filename) for filename in batch]
+        )
+
+        # Discord may sanitize filenames, so we rely on attachments being returned in upload order.
+        for filename, attachment in zip(batch, message.attachments):
+            urls[filename] = attachment.url
+
+    return urls
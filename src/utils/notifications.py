@@ -0,0 +1,245 @@
+"""
+Sends direct messages to Discord users.
+
+DM channel ids are persisted so a message normally costs a single API call, and messages to the same user
+within a short window are combined into as few sends as possible.
+Reminders can additionally be collected into a digest, which sends one embed per user every
+NOTIFICATION_DIGEST_SECONDS instead of one message per reminder.
+"""
+import asyncio
+import dataclasses
+from collections import defaultdict
+from typing import Coroutine, Dict, List, Optional, Set, Tuple
+
+import discord
+from sqlalchemy import select
+
+from common.conf import NOTIFICATION_DIGEST_SECONDS
+from common.db import session
+from common.logging import logger
+from datamodels.dm_channel import DmChannel
+
+BATCH_WINDOW = 2  # seconds
+MAX_CONTENT_LENGTH = 2000
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_FILES_PER_MESSAGE = 10
+MAX_FIELDS_PER_EMBED = 25
+
+
+@dataclasses.dataclass
+class Message:
+    content: Optional[str] = None
+    embeds: List[discord.Embed] = dataclasses.field(default_factory=list)
+    files: List[discord.File] = dataclasses.field(default_factory=list)
+
+    def can_merge(self, other: "Message") -> bool:
+        return (
+            len(self.joined_content(other) or "") <= MAX_CONTENT_LENGTH
+            and len(self.embeds) + len(other.embeds) <= MAX_EMBEDS_PER_MESSAGE
+            and len(self.files) + len(other.files) <= MAX_FILES_PER_MESSAGE
+        )
+
+    def merge(self, other: "Message"):
+        self.content = self.joined_content(other)
+        self.embeds += other.embeds
+        self.files += other.files
+
+    def joined_content(self, other: "Message") -> Optional[str]:
+        return "\n".join(filter(None, [self.content, other.content])) or None
+
+
+_dm_channels: Dict[int, int] = {}  # discord_id -> channel_id
+_loaded = False
+
+_pending: Dict[int, List[Tuple[Message, asyncio.Future]]] = defaultdict(list)
+_digests: Dict[int, List[Tuple[discord.Embed, Optional[discord.File], asyncio.Future]]] = defaultdict(list)
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _spawn(coro: Coroutine):
+    # The event loop only keeps weak references to tasks, so hold on to them until they finish
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def _load():
+    global _loaded
+
+    if not _loaded:
+        for dm_channel in session.execute(select(DmChannel)).scalars():
+            _dm_channels[dm_channel.discord_id] = dm_channel.channel_id
+        _loaded = True
+
+
+async def get_dm_channel(
+    bot: discord.Bot, discord_id: int
+) -> discord.abc.Messageable:
+    """
+    Returns the DM channel of a user, preferring the gateway cache and the stored channel id over API calls.
+    """
+    _load()
+
+    channel_id = _dm_channels.get(discord_id)
+    if channel_id:
+        return bot.get_channel(channel_id) or bot.get_partial_messageable(
+            channel_id, type=discord.ChannelType.private
+        )
+
+    user = bot.get_user(discord_id) or await bot.fetch_user(discord_id)
+    channel = user.dm_channel or await user.create_dm()
+
+    session.merge(DmChannel(discord_id=discord_id, channel_id=channel.id))
+    session.commit()
+    _dm_channels[discord_id] = channel.id
+
+    return channel
+
+
+def _forget_dm_channel(discord_id: int):
+    if _dm_channels.pop(discord_id, None):
+        dm_channel = session.get(DmChannel, (discord_id,))
+        if dm_channel:
+            session.delete(dm_channel)
+            session.commit()
+
+
+async def send_dm(
+    bot: discord.Bot,
+    discord_id: int,
+    content: Optional[str] = None,
+    *,
+    embed: Optional[discord.Embed] = None,
+    embeds: Optional[List[discord.Embed]] = None,
+    file: Optional[discord.File] = None,
+    files: Optional[List[discord.File]] = None,
+):
+    """
+    Sends a direct message to a user. Messages sent to the same user within BATCH_WINDOW seconds
+    are delivered together, and this returns once the message is delivered.
+    """
+    message = Message(
+        content=content,
+        embeds=(embeds or []) + ([embed] if embed else []),
+        files=(files or []) + ([file] if file else []),
+    )
+    future = asyncio.get_running_loop().create_future()
+
+    if not _pending[discord_id]:
+        _spawn(_flush_later(bot, discord_id))
+    _pending[discord_id].append((message, future))
+
+    await future
+
+
+async def _flush_later(bot: discord.Bot, discord_id: int):
+    await asyncio.sleep(BATCH_WINDOW)
+    pending = _pending.pop(discord_id, [])
+
+    batches: List[Tuple[Message, List[asyncio.Future]]] = []
+    for message, future in pending:
+        if batches and batches[-1][0].can_merge(message):
+            batches[-1][0].merge(message)
+            batches[-1][1].append(future)
+        else:
+            batches.append((message, [future]))
+
+    for message, futures in batches:
+        try:
+            await _deliver(bot, discord_id, message)
+        except Exception as ex:
+            for future in futures:
+                future.set_exception(ex)
+        else:
+            for future in futures:
+                future.set_result(None)
+
+
+async def _deliver(bot: discord.Bot, discord_id: int, message: Message):
+    channel = await get_dm_channel(bot, discord_id)
+    kwargs = dict(
+        content=message.content,
+        embeds=message.embeds or None,
+        files=message.files or None,
+    )
+    try:
+        await channel.send(**kwargs)
+    except discord.NotFound:
+        # Files are consumed by the first attempt, so only plain messages can be retried
+        if message.files:
+            raise
+        # The stored channel is gone, so open a new one and try once more
+        _forget_dm_channel(discord_id)
+        channel = await get_dm_channel(bot, discord_id)
+        await channel.send(**kwargs)
+
+
+async def send_reminder(
+    bot: discord.Bot,
+    discord_id: int,
+    embed: discord.Embed,
+    file: Optional[discord.File] = None,
+):
+    """
+    Sends a reminder to a user, returning once it is delivered and raising if it couldn't be.
+    Reminders sent within NOTIFICATION_DIGEST_SECONDS of the first one are delivered as a single digest,
+    so callers should only mark a reminder as done after this returns.
+    """
+    future = asyncio.get_running_loop().create_future()
+
+    if not _digests[discord_id]:
+        _spawn(_send_digest_later(bot, discord_id))
+    _digests[discord_id].append((embed, file, future))
+
+    await future
+
+
+async def _send_digest_later(bot: discord.Bot, discord_id: int):
+    await asyncio.sleep(NOTIFICATION_DIGEST_SECONDS)
+    reminders = _digests.pop(discord_id, [])
+
+    files = {}
+    for _, file, _ in reminders:
+        if file:
+            files.setdefault(file.filename, file)
+
+    if len(reminders) == 1:
+        embeds = [reminders[0][0]]
+    else:
+        embeds = create_digest_embeds([embed for embed, _, _ in reminders])
+
+    try:
+        for i in range(0, len(embeds), MAX_EMBEDS_PER_MESSAGE):
+            last = i + MAX_EMBEDS_PER_MESSAGE >= len(embeds)
+            await send_dm(
+                bot,
+                discord_id,
+                embeds=embeds[i:i + MAX_EMBEDS_PER_MESSAGE],
+                files=list(files.values()) if last else None,
+            )
+    except Exception as ex:
+        logger.exception(f"Cannot send reminders to {discord_id}")
+        for _, _, future in reminders:
+            future.set_exception(ex)
+    else:
+        for _, _, future in reminders:
+            future.set_result(None)
+
+
+def create_digest_embeds(embeds: List[discord.Embed]) -> List[discord.Embed]:
+    """
+    Combines reminder embeds into one field each, splitting across embeds when there are too many fields.
+    """
+    digests = []
+    for i in range(0, len(embeds), MAX_FIELDS_PER_EMBED):
+        digest = discord.Embed(
+            title=f"You have {len(embeds)} reminders",
+            color=embeds[0].color,
+        )
+        for embed in embeds[i:i + MAX_FIELDS_PER_EMBED]:
+            digest.add_field(
+                name=embed.title, value=embed.description or "\u200b", inline=False
+            )
+        digest.set_footer(text="You can turn these notifications off in /user settings")
+        digests.append(digest)
+    return digests
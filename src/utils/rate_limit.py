@@ -0,0 +1,34 @@
+import asyncio
+import time
+
+
+class RateLimiter:
+    """
+    Spaces out calls so that at most `rate` of them start within `per` seconds.
+
+    Usage:
+        limiter = RateLimiter(rate=2, per=1)
+
+        async with limiter:
+            await call_api()
+    """
+
+    def __init__(self, rate: float, per: float = 1.0):
+        self.interval = per / rate
+        self._next_slot = 0.0
+
+    async def acquire(self):
+        # Reserve the next free slot before sleeping, so concurrent callers queue up behind each other.
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
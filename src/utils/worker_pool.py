@@ -0,0 +1,21 @@
+import asyncio
+from typing import Awaitable, Callable, Iterable, TypeVar
+
+T = TypeVar("T")
+
+
+async def run_in_pool(items: Iterable[T], handler: Callable[[T], Awaitable], workers: int):
+    """
+    Calls `handler` for every item, with at most `workers` calls running at once.
+
+    The handler should deal with its own errors, since an exception stops the worker that raised it.
+    """
+    queue = asyncio.Queue()
+    for item in items:
+        queue.put_nowait(item)
+
+    async def worker():
+        while not queue.empty():
+            await handler(queue.get_nowait())
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
@@ -0,0 +1,8 @@
+import os
+
+# common.conf requires a token at import time
+os.environ.setdefault("BOT_TOKEN", "test")
+
+# Models referenced by GenshinUser relationships, needed to configure its mapper
+import datamodels.account_settings  # noqa: E402,F401
+import datamodels.uid_mapping  # noqa: E402,F401
@@ -0,0 +1,21 @@
+import unittest
+
+from common.autocomplete import AutocompleteIndex
+
+
+class AutocompleteIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = AutocompleteIndex(["Cor Lapis", "Crystal Marrow", "Dandelion Seed", "Cecilia"])
+
+    def test_prefix_keeps_original_case(self):
+        self.assertEqual(self.index.search("c", threshold=50), ["Cor Lapis", "Crystal Marrow", "Cecilia"])
+        self.assertEqual(self.index.search("CR", threshold=50), ["Crystal Marrow"])
+
+    def test_prefix_respects_limit(self):
+        self.assertEqual(self.index.search("c", threshold=50, limit=1), ["Cor Lapis"])
+
+    def test_fuzzy_match_allows_typos(self):
+        self.assertEqual(self.index.search("dandelon", threshold=70), ["Dandelion Seed"])
+
+    def test_no_match_below_threshold(self):
+        self.assertEqual(self.index.search("xyzxyz", threshold=50), [])
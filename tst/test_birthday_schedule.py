@@ -0,0 +1,41 @@
+import datetime
+import unittest
+
+import pytz
+
+from scheduling.birthday import next_birthday_at
+
+
+class NextBirthdayTest(unittest.TestCase):
+    def test_upcoming_birthday(self):
+        now = datetime.datetime(2024, 3, 1, tzinfo=pytz.UTC)
+
+        self.assertEqual(
+            next_birthday_at(3, 11, "UTC", now),
+            datetime.datetime(2024, 3, 11, tzinfo=pytz.UTC),
+        )
+
+    def test_ongoing_birthday_in_timezone_ahead_of_utc(self):
+        # Already March 11th at UTC+14 while it's still March 10th in UTC
+        now = datetime.datetime(2024, 3, 10, 11, tzinfo=pytz.UTC)
+
+        self.assertEqual(
+            next_birthday_at(3, 11, "Pacific/Kiritimati", now),
+            datetime.datetime(2024, 3, 10, 10, tzinfo=pytz.UTC),
+        )
+
+    def test_past_birthday_in_timezone_ahead_of_utc(self):
+        now = datetime.datetime(2024, 3, 10, 11, tzinfo=pytz.UTC)
+
+        self.assertEqual(
+            next_birthday_at(3, 10, "Pacific/Kiritimati", now),
+            datetime.datetime(2025, 3, 9, 10, tzinfo=pytz.UTC),
+        )
+
+    def test_leap_day_birthday_waits_for_leap_year(self):
+        now = datetime.datetime(2025, 1, 1, tzinfo=pytz.UTC)
+
+        self.assertEqual(
+            next_birthday_at(2, 29, "UTC", now),
+            datetime.datetime(2028, 2, 29, tzinfo=pytz.UTC),
+        )
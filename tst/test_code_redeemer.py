@@ -0,0 +1,66 @@
+import unittest
+
+import genshin
+
+from datamodels.code_redemption import CodeRedemption, RedemptionStatus
+from interfaces.code_redeemer import CodeRedeemer
+
+
+class FakeClient:
+    def __init__(self, error: Exception = None):
+        self.error = error
+
+    async def redeem_code(self, code: str, uid: int = None):
+        if self.error:
+            raise self.error
+
+
+class CodeRedeemerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_redeem_success(self):
+        status = await CodeRedeemer().redeem(FakeClient(), "CODE")
+
+        self.assertEqual(status, RedemptionStatus.REDEEMED)
+
+    async def test_redeem_claimed(self):
+        client = FakeClient(genshin.errors.RedemptionClaimed({"retcode": -2017}))
+        status = await CodeRedeemer().redeem(client, "CODE")
+
+        self.assertEqual(status, RedemptionStatus.ALREADY_CLAIMED)
+
+    async def test_redeem_invalid_code(self):
+        client = FakeClient(genshin.errors.RedemptionInvalid({"retcode": -2003}))
+        status = await CodeRedeemer().redeem(client, "CODE")
+
+        self.assertEqual(status, RedemptionStatus.INVALID_CODE)
+
+    async def test_redeem_invalid_cookies_is_raised(self):
+        client = FakeClient(genshin.errors.InvalidCookies({"retcode": -100}))
+
+        with self.assertRaises(genshin.errors.InvalidCookies):
+            await CodeRedeemer().redeem(client, "CODE")
+
+    async def test_redeem_other_error_fails(self):
+        client = FakeClient(genshin.errors.RedeemGameLevelTooLow({"retcode": -2011}))
+        status = await CodeRedeemer().redeem(client, "CODE")
+
+        self.assertEqual(status, RedemptionStatus.FAILED)
+
+    async def test_redeem_too_many_requests_is_raised(self):
+        client = FakeClient(genshin.errors.TooManyRequests({"retcode": -100}))
+
+        with self.assertRaises(genshin.errors.TooManyRequests):
+            await CodeRedeemer().redeem(client, "CODE")
+
+    def test_schedule_retry_backs_off_then_gives_up(self):
+        redeemer = CodeRedeemer()
+        job = CodeRedemption(mihoyo_id=1, code="CODE", attempts=0)
+
+        self.assertEqual(redeemer._schedule_retry(job), RedemptionStatus.PENDING)
+        first_retry = job.retry_at
+        self.assertEqual(redeemer.next_run_at, first_retry)
+        self.assertFalse(redeemer.is_due())
+        self.assertEqual(redeemer._schedule_retry(job), RedemptionStatus.PENDING)
+        self.assertGreater(job.retry_at, first_retry)
+
+        job.attempts = CodeRedeemer.MAX_ATTEMPTS - 1
+        self.assertEqual(redeemer._schedule_retry(job), RedemptionStatus.FAILED)
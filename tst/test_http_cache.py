@@ -0,0 +1,60 @@
+import unittest
+from typing import Dict
+
+from utils import http_cache
+from utils.http_cache import conditional_get
+
+
+class FakeResponse:
+    def __init__(self, status: int, body: bytes = b"", headers: Dict[str, str] = None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    async def read(self) -> bytes:
+        return self.body
+
+
+class FakeSession:
+    def __init__(self, *responses: FakeResponse):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url: str, headers: Dict[str, str] = None, **kwargs) -> FakeResponse:
+        self.requests.append(headers)
+        return self.responses.pop(0)
+
+
+class ConditionalGetTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        http_cache._responses.clear()
+
+    async def test_not_modified_returns_cached_body(self):
+        http = FakeSession(
+            FakeResponse(200, b"codes", {"ETag": '"v1"'}),
+            FakeResponse(304),
+        )
+
+        self.assertEqual(await conditional_get(http, "url"), (b"codes", True))
+        self.assertEqual(await conditional_get(http, "url"), (b"codes", False))
+        self.assertEqual(http.requests[1]["If-None-Match"], '"v1"')
+
+    async def test_same_content_is_unchanged(self):
+        http = FakeSession(
+            FakeResponse(200, b"codes"),
+            FakeResponse(200, b"codes"),
+            FakeResponse(200, b"new codes"),
+        )
+
+        self.assertEqual(await conditional_get(http, "url"), (b"codes", True))
+        self.assertEqual(await conditional_get(http, "url"), (b"codes", False))
+        self.assertEqual(await conditional_get(http, "url"), (b"new codes", True))
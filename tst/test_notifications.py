@@ -0,0 +1,52 @@
+import unittest
+
+import discord
+
+from utils.notifications import (
+    MAX_CONTENT_LENGTH,
+    MAX_FIELDS_PER_EMBED,
+    Message,
+    create_digest_embeds,
+)
+
+
+class MessageTest(unittest.TestCase):
+    def test_can_merge_small_messages(self):
+        a = Message(content="a", embeds=[discord.Embed()])
+        b = Message(content="b", embeds=[discord.Embed()])
+
+        self.assertTrue(a.can_merge(b))
+        a.merge(b)
+        self.assertEqual(a.content, "a\nb")
+        self.assertEqual(len(a.embeds), 2)
+
+    def test_cannot_merge_long_content(self):
+        a = Message(content="a" * (MAX_CONTENT_LENGTH - 1))
+        b = Message(content="b")
+
+        # The newline joining both contents pushes it over the limit
+        self.assertFalse(a.can_merge(b))
+
+    def test_cannot_merge_too_many_embeds(self):
+        a = Message(embeds=[discord.Embed() for _ in range(6)])
+        b = Message(embeds=[discord.Embed() for _ in range(5)])
+
+        self.assertFalse(a.can_merge(b))
+
+
+class DigestTest(unittest.TestCase):
+    def test_one_field_per_reminder(self):
+        embeds = [discord.Embed(title=f"Reminder {i}", description=f"UID: {i}") for i in range(3)]
+
+        digests = create_digest_embeds(embeds)
+
+        self.assertEqual(len(digests), 1)
+        self.assertEqual([field.name for field in digests[0].fields], ["Reminder 0", "Reminder 1", "Reminder 2"])
+        self.assertEqual(digests[0].fields[1].value, "UID: 1")
+
+    def test_splits_when_too_many_fields(self):
+        embeds = [discord.Embed(title=f"Reminder {i}") for i in range(MAX_FIELDS_PER_EMBED + 5)]
+
+        digests = create_digest_embeds(embeds)
+
+        self.assertEqual([len(digest.fields) for digest in digests], [MAX_FIELDS_PER_EMBED, 5])
@@ -0,0 +1,41 @@
+import asyncio
+import time
+import unittest
+
+from utils.rate_limit import RateLimiter
+
+
+class RateLimiterTest(unittest.IsolatedAsyncioTestCase):
+    async def test_first_call_is_not_delayed(self):
+        limiter = RateLimiter(rate=1, per=10)
+
+        start = time.monotonic()
+        await limiter.acquire()
+
+        self.assertLess(time.monotonic() - start, 0.05)
+
+    async def test_calls_are_spaced_out(self):
+        limiter = RateLimiter(rate=20, per=1)
+        timestamps = []
+
+        async def call():
+            async with limiter:
+                timestamps.append(time.monotonic())
+
+        await asyncio.gather(*(call() for _ in range(5)))
+
+        gaps = [b - a for a, b in zip(timestamps, timestamps[1:])]
+        self.assertEqual(len(gaps), 4)
+        for gap in gaps:
+            self.assertGreaterEqual(gap, 0.045)
+
+    async def test_idle_time_does_not_accumulate(self):
+        limiter = RateLimiter(rate=20, per=1)
+        await limiter.acquire()
+        await asyncio.sleep(0.2)
+
+        start = time.monotonic()
+        await limiter.acquire()
+        await limiter.acquire()
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.045)
@@ -0,0 +1,31 @@
+import datetime
+import unittest
+
+from interfaces import route_loader
+
+
+class BuildIndexTest(unittest.TestCase):
+    def test_indexed_images_are_ordered(self):
+        route_loader.build_index([
+            ("Cor Lapis.2.png", "url2"),
+            ("Cor Lapis.1.png", "url1"),
+            ("Cor Lapis.3.png", "url3"),
+        ])
+
+        self.assertEqual(route_loader.get_route_images("Cor Lapis"), ["url1", "url2", "url3"])
+
+    def test_plain_name(self):
+        route_loader.build_index([("Cecilia.png", "url")])
+
+        self.assertEqual(route_loader.get_route_images("Cecilia"), ["url"])
+        self.assertEqual(route_loader.get_route_options(None), ("Cecilia",))
+
+
+class UrlExpiryTest(unittest.TestCase):
+    def test_signed_url(self):
+        url = "https://cdn.discordapp.com/attachments/1/2/Mora.png?ex=65a2b5c0&is=659040c0&hm=abc"
+
+        self.assertEqual(route_loader._url_expires_at(url), datetime.datetime(2024, 1, 13, 16, 9, 36))
+
+    def test_unsigned_url(self):
+        self.assertIsNone(route_loader._url_expires_at("https://example.com/Mora.png"))
@@ -0,0 +1,31 @@
+import asyncio
+import unittest
+
+from utils.worker_pool import run_in_pool
+
+
+class WorkerPoolTest(unittest.IsolatedAsyncioTestCase):
+    async def test_every_item_is_handled(self):
+        handled = []
+
+        async def handler(item):
+            handled.append(item)
+
+        await run_in_pool(range(10), handler, workers=3)
+
+        self.assertEqual(sorted(handled), list(range(10)))
+
+    async def test_concurrency_is_bounded(self):
+        running = 0
+        most_running = 0
+
+        async def handler(_):
+            nonlocal running, most_running
+            running += 1
+            most_running = max(most_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        await run_in_pool(range(10), handler, workers=3)
+
+        self.assertEqual(most_running, 3)